@@ -0,0 +1,63 @@
+"""Microbenchmark of the per-call overhead of viewers' `view` and `iter_over` dispatch.
+
+Calls through the dispatching methods are compared with direct calls of the implementations they resolve to and with
+the dispatch based on `inspect.Signature.bind` that was used before implementations were cached.
+
+Usage:
+    python benchmarks/bench_dispatch.py [--number N]
+"""
+
+import functools
+import inspect
+import timeit
+from argparse import ArgumentParser
+
+from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
+from stubmaker.viewers.stub_viewer import StubViewer
+
+
+def bind_based_singledispatchmethod(method):
+    """Previous dispatch implementation: binds arguments to the signature on every call"""
+
+    dispatcher = functools.singledispatch(method.__wrapped__)
+    signature = inspect.signature(method.__wrapped__)
+
+    def wrapper(*args, **kwargs):
+        dispatch_type = signature.bind(*args, **kwargs).args[1].__class__
+        return dispatcher.dispatch(dispatch_type)(*args, **kwargs)
+
+    for cls, implementation in method.registry.items():
+        if cls is not object:
+            dispatcher.register(cls, implementation)
+    return wrapper
+
+
+def time_per_call(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--number', type=int, default=200_000, help='Number of calls per measurement')
+    args = parser.parse_args()
+
+    builder = RepresentationsTreeBuilder('bench_dispatch', inspect.getmodule(main))
+    literal = builder.get_literal(builder.create_node_for_object('', None, 42))
+    viewer = StubViewer()
+    bind_based_view = bind_based_singledispatchmethod(StubViewer.view)
+    bind_based_iter_over = bind_based_singledispatchmethod(StubViewer.iter_over)
+
+    cases = [
+        ('view: direct call', lambda: viewer.view_value_literal(literal)),
+        ('view: dispatch', lambda: viewer.view(literal)),
+        ('view: Signature.bind dispatch', lambda: bind_based_view(viewer, literal)),
+        ('iter_over: direct call', lambda: viewer.iter_over_value_literal(literal)),
+        ('iter_over: dispatch', lambda: viewer.iter_over(literal)),
+        ('iter_over: Signature.bind dispatch', lambda: bind_based_iter_over(viewer, literal)),
+    ]
+    for name, func in cases:
+        print(f'{name:<40}{time_per_call(func, args.number):8.1f} ns/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark of memory taken by representation trees of a big module.
+
+A wide synthetic module (see synthetic_package) is imported and its representation tree is built with every definition
+materialized (as it is when the stub is rendered). Reported are the number of Node and representation objects and the
+memory taken by them compared with the same objects of a `__dict__`-based hierarchy, as well as the memory allocated
+while building the tree. The `__dict__`-based hierarchy is defined at runtime: every slotted class gets a class without
+`__slots__` that has the same attributes. Object sizes are measured with tracemalloc by copying the objects of every
+class to instances of the slotted and of the `__dict__`-based classes, so that instance dictionaries (and values
+stored in objects inline, as in Python 3.11+) are accounted for.
+
+Usage:
+    python benchmarks/bench_memory.py [--size N]
+"""
+
+import gc
+import importlib
+import sys
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from collections import defaultdict
+from typing import DefaultDict, List
+
+from stubmaker.builder.common import BaseRepresentation, Node
+from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
+from stubmaker.viewers.stub_viewer import StubViewer
+
+from synthetic_package import PACKAGE_NAME, write_package
+
+
+def get_attribute_names(cls: type) -> List[str]:
+    """Returns names of slots of cls and its bases, bases first"""
+
+    attribute_names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        for slot in [slots] if isinstance(slots, str) else slots:
+            if slot not in ('__dict__', '__weakref__'):
+                attribute_names.append(slot)
+    return attribute_names
+
+
+def measure_copies(objects: list, cls: type, attribute_names: List[str]) -> int:
+    """Returns memory allocated for copies of objects created as instances of cls"""
+
+    copies = [None] * len(objects)
+    tracemalloc.start()
+    for index, obj in enumerate(objects):
+        copy = object.__new__(cls)
+        for attribute_name in attribute_names:
+            if hasattr(obj, attribute_name):
+                object.__setattr__(copy, attribute_name, getattr(obj, attribute_name))
+        for attribute_name, value in getattr(obj, '__dict__', {}).items():
+            object.__setattr__(copy, attribute_name, value)
+        copies[index] = copy
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return traced
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--size', type=int, default=10_000, help='Number of members of the module')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        write_package('wide', args.size, output_dir)
+        sys.path.insert(0, output_dir)
+        module = importlib.import_module(f'{PACKAGE_NAME}.wide')
+
+        gc.collect()
+        tracemalloc.start()
+        builder = RepresentationsTreeBuilder(module.__name__, module)
+        StubViewer().get_used_members_ids(builder.module_rep)
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    objects_by_class: DefaultDict[type, list] = defaultdict(list)
+    for obj in gc.get_objects():
+        if isinstance(obj, (Node, BaseRepresentation)):
+            objects_by_class[type(obj)].append(obj)
+
+    print(f'{"class":<24}{"objects":>10}{"slots, KB":>12}{"__dict__, KB":>14}')
+    total_count = total_slotted_size = total_dict_size = 0
+    for cls, objects in sorted(objects_by_class.items(), key=lambda item: len(item[1]), reverse=True):
+        attribute_names = get_attribute_names(cls)
+        dict_based_cls = type(cls.__name__, (), {})
+        slotted_size = measure_copies(objects, cls, attribute_names)
+        dict_size = measure_copies(objects, dict_based_cls, attribute_names)
+        print(f'{cls.__name__:<24}{len(objects):>10}{slotted_size / 1024:>12.1f}{dict_size / 1024:>14.1f}')
+        total_count += len(objects)
+        total_slotted_size += slotted_size
+        total_dict_size += dict_size
+    print(f'{"total":<24}{total_count:>10}{total_slotted_size / 1024:>12.1f}{total_dict_size / 1024:>14.1f}')
+    print(
+        f'\nSlots save {(total_dict_size - total_slotted_size) / 2 ** 20:.1f} MB'
+        f' ({1 - total_slotted_size / total_dict_size:.0%} of the __dict__-based hierarchy)'
+    )
+    print(f'Allocated while building the tree: {traced / 2 ** 20:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark of how the stub generation pipeline scales with the size of synthetic packages.
+
+For every shape of synthetic_package and every size the package is generated and processed in a fresh interpreter:
+all of its modules are imported, their representation trees are built and rendered by StubViewer and MarkdownViewer.
+Wall time and peak resident set size of the whole pipeline are reported along with durations of its components:
+
+* build: construction of RepresentationsTreeBuilder (module members are enumerated, definitions are built lazily);
+* traverse: the first `get_used_members_ids` walk which builds definitions reachable from module members;
+* used_members: `get_used_members_ids` over already built definitions;
+* class_members: `BaseClassDef.get_public_member_names` of every class of the module;
+* stub_viewer: rendering of the module stub;
+* markdown_viewer: rendering of documentation of classes and functions of the module.
+
+The exponent column estimates k in `time ~ size ** k` between consecutive sizes so that complexity regressions stand
+out: linear components should stay close to 1.
+
+Usage:
+    python benchmarks/bench_scaling.py [--shapes SHAPE ...] [--scales SCALE ...] [--json PATH] [--max-exponent K]
+"""
+
+import gc
+import importlib
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Dict, List
+
+from synthetic_package import PACKAGE_NAME, SHAPES, write_package
+
+# Sizes of shapes multiplied by scales: the default largest scale of 4 yields e.g. a module with 10k members
+BASE_SIZES = {
+    'modules': 50,
+    'wide': 2500,
+    'inheritance': 50,
+    'enum': 1000,
+    'all': 1000,
+    'generics': 10,
+}
+
+COMPONENTS = ['import', 'build', 'traverse', 'used_members', 'class_members', 'stub_viewer', 'markdown_viewer']
+
+
+def get_peak_memory() -> int:
+    """Returns peak resident set size of the current process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(output_dir: str) -> dict:
+    """Runs the pipeline over all modules of the package in output_dir and returns durations of its components"""
+
+    from stubmaker.builder import traverse_modules
+    from stubmaker.builder.definitions import BaseClassDef, FunctionDef
+    from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
+    from stubmaker.viewers.markdown_viewer import MarkdownViewer
+    from stubmaker.viewers.stub_viewer import StubViewer
+
+    durations = dict.fromkeys(COMPONENTS, 0.0)
+
+    def timed(component, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        durations[component] += time.perf_counter() - start
+        return result
+
+    gc.collect()
+    started_at = time.perf_counter()
+    sys.path.insert(0, output_dir)
+    timed('import', importlib.import_module, PACKAGE_NAME)
+    modules = timed('import', lambda: list(traverse_modules(PACKAGE_NAME, os.path.join(output_dir, PACKAGE_NAME))))
+
+    for module_name, module in modules:
+        builder = timed('build', RepresentationsTreeBuilder, module_name, module)
+        module_def = builder.module_rep
+        timed('traverse', StubViewer().get_used_members_ids, module_def)
+        timed('used_members', StubViewer().get_used_members_ids, module_def)
+        for member in module_def.members.values():
+            if isinstance(member, BaseClassDef):
+                timed('class_members', member.get_public_member_names)
+        timed('stub_viewer', StubViewer().view, module_def)
+        # Markdown is rendered for classes and functions only
+        markdown_viewer = MarkdownViewer()
+        for member in module_def.members.values():
+            if isinstance(member, (BaseClassDef, FunctionDef)):
+                timed('markdown_viewer', markdown_viewer.view, member)
+
+    return {
+        'wall_time': time.perf_counter() - started_at,
+        'peak_memory': get_peak_memory(),
+        'components': durations,
+    }
+
+
+def run_measurement(shape: str, size: int) -> dict:
+    """Generates the package and measures it in a fresh interpreter so that peak memory is not shared between runs"""
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        write_package(shape, size, output_dir)
+        process = subprocess.run(
+            [sys.executable, __file__, '--measure', output_dir],
+            stdout=subprocess.PIPE,
+            check=True,
+            text=True,
+        )
+    return {'shape': shape, 'size': size, **json.loads(process.stdout)}
+
+
+def get_exponent(previous: dict, current: dict, key: str) -> float:
+    if previous[key] <= 0 or current[key] <= 0:
+        return math.nan
+    return math.log(current[key] / previous[key]) / math.log(current['size'] / previous['size'])
+
+
+def print_shape_results(shape: str, results: List[dict]):
+    print(f'\n{shape}')
+    header = f'{"size":>8}{"wall, s":>10}{"exponent":>10}{"peak, MB":>10}' + ''.join(f'{c:>16}' for c in COMPONENTS)
+    print(header)
+    for index, result in enumerate(results):
+        exponent = get_exponent(results[index - 1], result, 'wall_time') if index else math.nan
+        print(
+            f'{result["size"]:>8}{result["wall_time"]:>10.3f}{exponent:>10.2f}{result["peak_memory"] / 2 ** 20:>10.1f}'
+            + ''.join(f'{result["components"][component]:>16.4f}' for component in COMPONENTS)
+        )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(BASE_SIZES))
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 2, 4], help='Multipliers of base sizes of shapes')
+    parser.add_argument('--json', type=os.path.abspath, help='Path to write results to as json')
+    parser.add_argument(
+        '--max-exponent',
+        type=float,
+        help='Exit with non-zero code if wall time of any shape grows faster than size ** max_exponent',
+    )
+    parser.add_argument('--measure', help='Internal: measure the package in the given directory and print results')
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    all_results: Dict[str, List[dict]] = {}
+    regressions = []
+    for shape in args.shapes:
+        results = [run_measurement(shape, BASE_SIZES[shape] * scale) for scale in sorted(args.scales)]
+        all_results[shape] = results
+        print_shape_results(shape, results)
+        for previous, current in zip(results, results[1:]):
+            exponent = get_exponent(previous, current, 'wall_time')
+            if args.max_exponent is not None and exponent > args.max_exponent:
+                regressions.append(f'{shape}: {previous["size"]} -> {current["size"]} scales as size ** {exponent:.2f}')
+
+    if args.json:
+        with open(args.json, 'w') as json_flo:
+            json.dump(all_results, json_flo, indent=4)
+
+    if regressions:
+        sys.exit('Scaling regressions:\n' + '\n'.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
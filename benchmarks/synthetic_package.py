@@ -0,0 +1,152 @@
+"""Generator of synthetic packages stressing the stub generation pipeline.
+
+Every shape stresses a single dimension of a package and is parameterised by its size:
+
+* modules: a package of `size` small modules;
+* wide: a module with `size` functions, classes and constants;
+* inheritance: a chain of `size` classes each inheriting the previous one and redefining some of its members;
+* enum: an enum with `size` members;
+* all: a module reexporting `size` names from a sibling module through `__all__`;
+* generics: functions annotated with generic types nested `size` levels deep.
+
+Usage:
+    python benchmarks/synthetic_package.py SHAPE SIZE OUTPUT_DIR [--package-name NAME]
+"""
+
+import os
+from argparse import ArgumentParser
+from typing import Callable, Dict, List
+
+PACKAGE_NAME = 'synthetic'
+
+
+def _format_all(names: List[str]) -> str:
+    return '__all__ = [\n' + ''.join(f"    '{name}',\n" for name in names) + ']\n'
+
+
+def _format_members(index: int) -> str:
+    return (
+        f'def function_{index}(a: int, b: str = "b", *args: float, c: Optional[List[int]] = None, **kwargs) -> str:\n'
+        f'    """Function {index}.\n\n'
+        f'    Args:\n'
+        f'        a: first argument.\n'
+        f'        b: second argument.\n'
+        f'    """\n\n\n'
+        f'class Class{index}:\n'
+        f'    """Class {index}"""\n\n'
+        f'    attribute: Dict[str, int]\n\n'
+        f'    def method(self, value: int) -> "Class{index}":\n'
+        f'        pass\n\n'
+        f'    @property\n'
+        f'    def prop(self) -> int:\n'
+        f'        return {index}\n\n\n'
+        f'CONSTANT_{index} = {index}\n\n\n'
+    )
+
+
+def _get_member_names(index: int) -> List[str]:
+    return [f'function_{index}', f'Class{index}', f'CONSTANT_{index}']
+
+
+_HEADER = 'from typing import Dict, List, Optional\n\n'
+
+
+def generate_modules(size: int) -> Dict[str, str]:
+    modules = {'__init__': _format_all([])}
+    for index in range(size):
+        modules[f'module_{index}'] = _format_all(_get_member_names(index)) + _HEADER + _format_members(index)
+    return modules
+
+
+def generate_wide(size: int) -> Dict[str, str]:
+    count = max(size // 3, 1)
+    names = [name for index in range(count) for name in _get_member_names(index)]
+    body = ''.join(_format_members(index) for index in range(count))
+    return {'__init__': _format_all([]), 'wide': _format_all(names) + _HEADER + body}
+
+
+def generate_inheritance(size: int) -> Dict[str, str]:
+    chunks = [_format_all([f'Class{index}' for index in range(size)]), _HEADER, 'class Class0:\n    pass\n\n\n']
+    for index in range(1, size):
+        chunks.append(
+            f'class Class{index}(Class{index - 1}):\n'
+            f'    attribute_{index}: int\n\n'
+            f'    def method_{index}(self, value: int) -> int:\n'
+            f'        pass\n\n'
+            f'    def method_{index - 1}(self, value: int) -> int:\n'
+            f'        pass\n\n\n'
+        )
+    return {'__init__': _format_all([]), 'inheritance': ''.join(chunks)}
+
+
+def generate_enum(size: int) -> Dict[str, str]:
+    members = ''.join(f'    MEMBER_{index} = {index}\n' for index in range(size))
+    return {
+        '__init__': _format_all([]),
+        'enum': _format_all(['Huge']) + 'from enum import Enum\n\n\n' + f'class Huge(Enum):\n{members}',
+    }
+
+
+def generate_all(size: int) -> Dict[str, str]:
+    count = max(size // 3, 1)
+    names = [name for index in range(count) for name in _get_member_names(index)]
+    imports = ''.join(f'from .definitions import {name}\n' for name in names)
+    return {
+        '__init__': _format_all([]),
+        'definitions': _format_all(names) + _HEADER + ''.join(_format_members(index) for index in range(count)),
+        'reexports': _format_all(names) + imports,
+    }
+
+
+def generate_generics(size: int) -> Dict[str, str]:
+    def nested(depth: int, leaf: str) -> str:
+        annotation = leaf
+        for level in range(depth):
+            annotation = ('Dict[str, {}]', 'List[{}]', 'Tuple[{}, int]', 'Optional[{}]')[level % 4].format(annotation)
+        return annotation
+
+    functions = ''.join(
+        f'def function_{index}(value: {nested(size, "T")}) -> {nested(size, "int")}:\n    pass\n\n\n'
+        for index in range(10)
+    )
+    return {
+        '__init__': _format_all([]),
+        'generics': _format_all([f'function_{index}' for index in range(10)])
+        + "from typing import Dict, List, Optional, Tuple, TypeVar\n\nT = TypeVar('T')\n\n\n"
+        + functions,
+    }
+
+
+SHAPES: Dict[str, Callable[[int], Dict[str, str]]] = {
+    'modules': generate_modules,
+    'wide': generate_wide,
+    'inheritance': generate_inheritance,
+    'enum': generate_enum,
+    'all': generate_all,
+    'generics': generate_generics,
+}
+
+
+def write_package(shape: str, size: int, output_dir: str, package_name: str = PACKAGE_NAME) -> str:
+    """Writes a package of the given shape to output_dir and returns the path to the package"""
+
+    package_path = os.path.join(output_dir, package_name)
+    os.makedirs(package_path, exist_ok=True)
+    for module_name, source in SHAPES[shape](size).items():
+        with open(os.path.join(package_path, f'{module_name}.py'), 'w') as module_flo:
+            module_flo.write(source)
+    return package_path
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('shape', choices=sorted(SHAPES))
+    parser.add_argument('size', type=int)
+    parser.add_argument('output_dir', type=os.path.abspath)
+    parser.add_argument('--package-name', default=PACKAGE_NAME)
+    args = parser.parse_args()
+    print(write_package(args.shape, args.size, args.output_dir, args.package_name))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,279 @@
 import importlib.util
+import multiprocessing
 import os
 import json
+import logging
 import sys
+import time
 from argparse import ArgumentParser
+from importlib import import_module
 
-from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
-from stubmaker.builder import override_module_import_path, traverse_modules
-from stubmaker.viewers.stub_viewer import StubViewer
+from stubmaker.api import get_stub_path, render_stub
+from stubmaker.builder import (
+    IntrospectionCache,
+    ModulesAliasesMapping,
+    ObjectIndex,
+    StaticModuleLoader,
+    find_source_path,
+    iter_module_names,
+    iter_source_module_names,
+    override_module_import_path,
+)
+from stubmaker.dependencies import DependencyGraph
+from stubmaker.manifest import MANIFEST_FILE_NAME, StubsManifest, get_common_inputs, get_module_inputs
+from stubmaker.supervisor import ModuleBudget, get_rss, run_supervised
+from stubmaker.timings import Timings
+from stubmaker.watch import SourcesWatcher
+
+# Options shared by all modules of a run. Set before forking worker processes so that workers inherit them without
+# pickling (described objects are arbitrary python objects)
+_worker_options: dict = {}
+
+# Written instead of stubs of modules exceeding their budget: any name may be imported from such module
+MINIMAL_STUB = """\
+# Stub generation for module {module_name} {reason}
+from typing import Any
+
+
+def __getattr__(name: str) -> Any: ...
+"""
+
+
+def get_source_path(module_name):
+    # Resolving the source file without importing the module itself (only its parent packages get imported)
+    return importlib.util.find_spec(module_name).origin
+
+
+def get_partial_stub_path(dst_path):
+    return f'{dst_path}.tmp'
+
+
+def write_stub(
+    module_name,
+    module,
+    dst_path,
+    module_root,
+    described_objects,
+    modules_aliases_mapping,
+    object_index,
+    introspection_cache,
+    timings=None,
+):
+    if timings is None:
+        timings = Timings()
+
+    # Ensuring dst directory exists
+    dst_dir = os.path.dirname(dst_path)
+    os.makedirs(dst_dir, exist_ok=True)
+
+    # Streaming the stub to a temporary file as it is rendered. It replaces the previous stub only once it is complete
+    tmp_path = get_partial_stub_path(dst_path)
+    try:
+        with open(tmp_path, 'w') as stub_flo:
+            dependencies = render_stub(
+                module_name,
+                module,
+                stub_flo,
+                module_root=module_root,
+                described_objects=described_objects,
+                modules_aliases_mapping=modules_aliases_mapping,
+                object_index=object_index,
+                introspection_cache=introspection_cache,
+                timings=timings,
+            )
+        with timings.measure(module_name, 'write'):
+            os.replace(tmp_path, dst_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return dependencies
+
+
+def write_minimal_stub(module_name, dst_path, reason):
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    with open(dst_path, 'w') as stub_flo:
+        stub_flo.write(MINIMAL_STUB.format(module_name=module_name, reason=reason))
+
+
+def _init_worker(options):
+    _worker_options.update(options)
+
+
+def _import_module(module_name, object_index):
+    module = import_module(module_name)
+    object_index.add_module(module)
+    return module
+
+
+def _write_stub_with_timings(module_name, dst_path, options, timings):
+    with timings.measure(module_name, 'import'):
+        module = _import_module(module_name, options['object_index'])
+    return write_stub(module_name, module, dst_path, **options, timings=timings)
+
+
+def _write_stub_in_worker(task):
+    module_name, dst_path = task
+    # Timings are sent back to the main process along with the task
+    timings = Timings()
+    dependencies = _write_stub_with_timings(module_name, dst_path, _worker_options, timings)
+    return module_name, dst_path, timings.modules, dependencies
+
+
+def _write_stubs(tasks, options, jobs, budget, timings):
+    """Yields module name, stub path, modules the stub depends on and the description of the exceeded budget (if any)
+    for each task
+    """
+
+    if budget.is_set:
+        # Every module is imported and processed in a worker of its own so that the worker can be killed once it
+        # exceeds the budget
+        _init_worker(options)
+        for (module_name, dst_path), result, failure in run_supervised(tasks, _write_stub_in_worker, budget, jobs):
+            if result is not None:
+                timings.update(result[2])
+            yield module_name, dst_path, result and result[3], failure
+        return
+
+    if jobs == 1:
+        for module_name, dst_path in tasks:
+            dependencies = _write_stub_with_timings(module_name, dst_path, options, timings)
+            yield module_name, dst_path, dependencies, None
+        return
+
+    context = multiprocessing.get_context('fork')
+    with context.Pool(jobs, initializer=_init_worker, initargs=(options,)) as pool:
+        # imap preserves the order of tasks so the log does not depend on completion order
+        for module_name, dst_path, module_timings, dependencies in pool.imap(_write_stub_in_worker, tasks):
+            timings.update(module_timings)
+            yield module_name, dst_path, dependencies, None
+
+
+def _get_module_source_path(module_name, args):
+    if args.static:
+        return find_source_path(args.module_root, args.src_root, module_name)
+    return get_source_path(module_name)
+
+
+def _get_module_names(args):
+    if args.static:
+        return list(iter_source_module_names(args.module_root, args.src_root))
+    return list(iter_module_names(args.module_root, args.src_root))
+
+
+def _load_modules(module_names, loader, timings):
+    # Building only the modules whose stubs are generated (modules they import are built on demand) before
+    # registering any of them in sys.modules so that modules that can't be built statically are imported first
+    for module_name in module_names:
+        with timings.measure(module_name, 'import'):
+            loader.load(module_name)
+    loader.register_modules()
+
+
+def _process_results(results, args, manifest, modules_inputs, dependency_graph):
+    for module_name, dst_path, dependencies, failure in results:
+        if failure is None:
+            print(f'{module_name} -> {dst_path}')
+            dependency_graph.set_dependencies(module_name, dependencies)
+            if manifest is not None:
+                manifest.update(module_name, dst_path, modules_inputs[module_name], dependencies)
+        elif args.on_budget_exceeded == 'stub':
+            # Not updating the manifest so that the module is retried on the next run
+            logging.warning(f'Writing minimal stub of module {module_name} which {failure}')
+            write_minimal_stub(module_name, dst_path, failure)
+            print(f'{module_name} -> {dst_path} (minimal stub)')
+        else:
+            logging.warning(f'Skipping module {module_name} which {failure}')
+
+        # Killed workers can't clean up after themselves
+        if failure is not None and os.path.exists(get_partial_stub_path(dst_path)):
+            os.remove(get_partial_stub_path(dst_path))
+
+
+def _report_timings(args, timings, wall_time):
+    if args.timings:
+        sys.stderr.write(timings.format(wall_time))
+    if args.timings_json:
+        with open(args.timings_json, 'w') as timings_flo:
+            json.dump(timings.to_json(wall_time), timings_flo, indent=4)
+
+
+def _unload_modules(module_names, loader, options):
+    """Unloads modules to import (or build) them again and drops their objects from run-wide indexes and caches"""
+
+    for module_name in module_names:
+        if loader is not None:
+            loader.unload(module_name)
+        else:
+            sys.modules.pop(module_name, None)
+        options['object_index'].remove_module(module_name)
+        options['introspection_cache'].remove_module(module_name)
+
+
+def _watch(args, watcher, module_names, options, budget, manifest, common_inputs, loader, dependency_graph):
+    """Regenerates stubs of modules whose source files are changed (along with stubs depending on them) until
+    interrupted
+    """
+
+    source_paths = {_get_module_source_path(module_name, args): module_name for module_name in module_names}
+    while True:
+        time.sleep(args.watch_interval)
+        modified_paths, added_paths, removed_paths = watcher.poll()
+        if not modified_paths and not added_paths and not removed_paths:
+            continue
+
+        started_at = time.perf_counter()
+        timings = Timings()
+        try:
+            # Modules are imported (or built) again when their stubs are written. Modules depending on changed ones
+            # hold objects of the previous version of changed modules, so they are imported again as well
+            changed_module_names = {source_paths[path] for path in modified_paths if path in source_paths}
+            removed_module_names = {source_paths[path] for path in removed_paths if path in source_paths}
+            affected_module_names = dependency_graph.get_reverse_closure(changed_module_names | removed_module_names)
+            _unload_modules(affected_module_names, loader, options)
+            for module_name in removed_module_names:
+                dependency_graph.remove(module_name)
+
+            if added_paths or removed_paths:
+                module_names = _get_module_names(args)
+                source_paths = {_get_module_source_path(module_name, args): module_name for module_name in module_names}
+                affected_module_names |= {source_paths[path] for path in added_paths if path in source_paths}
+            changed_module_names = sorted(affected_module_names & set(module_names))
+
+            if loader is not None:
+                _load_modules(changed_module_names, loader, timings)
+
+            tasks = []
+            modules_inputs = {}
+            for module_name in changed_module_names:
+                src_path = _get_module_source_path(module_name, args)
+                if manifest is not None:
+                    modules_inputs[module_name] = get_module_inputs(src_path, common_inputs)
+                tasks.append((module_name, get_stub_path(src_path, args.src_root, args.output_dir)))
+            _process_results(
+                _write_stubs(tasks, options, args.jobs, budget, timings),
+                args,
+                manifest,
+                modules_inputs,
+                dependency_graph,
+            )
+
+            if manifest is not None:
+                for dst_path in manifest.remove_stale(module_names):
+                    print(f'Removed {dst_path}')
+                manifest.save()
+            else:
+                for src_path in removed_paths:
+                    dst_path = get_stub_path(src_path, args.src_root, args.output_dir)
+                    if os.path.exists(dst_path):
+                        os.remove(dst_path)
+                        print(f'Removed {dst_path}')
+        except Exception:
+            # Keeping watching: the module is generated again once its source file is fixed
+            logging.exception('Failed to regenerate stubs')
+
+        _report_timings(args, timings, time.perf_counter() - started_at)
+        sys.stdout.flush()
 
 
 def main():
@@ -29,7 +296,88 @@ def main():
         required=False,
         help='Path to module names to aliases mapping in json format.',
     )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes used to generate stubs. Workers are forked after the root module is imported '
+        'so its dependencies are shared between them.',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=f'Keep a manifest of generation inputs ({MANIFEST_FILE_NAME}) in output-dir and only regenerate stubs '
+        'of modules whose source file, described objects, modules aliases, stubmaker or python version changed '
+        'along with stubs depending on such modules (e.g. reexporting their names). Stubs of removed modules are '
+        'deleted.',
+    )
+    parser.add_argument(
+        '--static',
+        action='store_true',
+        help='Build modules from their source files instead of importing them. Modules of other packages are imported '
+        'only if they are already imported or belong to the standard library. Modules that can not be built '
+        'statically (e.g. using metaclasses or decorators defined in the package) are imported.',
+    )
+    parser.add_argument(
+        '--module-timeout',
+        type=float,
+        required=False,
+        help='Wall time budget in seconds for importing a module and generating its stub. Each module is processed in '
+        'a forked worker of its own which is killed once it exceeds the budget (see --on-budget-exceeded).',
+    )
+    parser.add_argument(
+        '--module-memory-limit',
+        type=float,
+        required=False,
+        help='Memory budget in megabytes for importing a module and generating its stub, measured as the growth of '
+        'the resident set size of the worker processing the module. Requires /proc.',
+    )
+    parser.add_argument(
+        '--on-budget-exceeded',
+        choices=['stub', 'skip'],
+        default='stub',
+        help='What to do with modules exceeding their budget: write a minimal stub allowing any name to be imported '
+        'from the module (default) or report the module and keep its previous stub if any.',
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Print durations of importing, building, rendering and writing stubs of modules to stderr, from the most '
+        'expensive module to the least expensive one',
+    )
+    parser.add_argument(
+        '--timings-json',
+        type=os.path.abspath,
+        required=False,
+        help='Path to write durations of importing, building, rendering and writing stubs of modules to as json',
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running after stubs are generated and regenerate stubs of modules whose source files are changed, '
+        'added or removed along with stubs depending on such modules. Only these modules are imported (or built) '
+        'again.',
+    )
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=0.2,
+        help='Interval in seconds between polls of source files in watch mode.',
+    )
     args = parser.parse_args()
+    started_at = time.perf_counter()
+    timings = Timings()
+
+    budget = ModuleBudget(
+        timeout=args.module_timeout,
+        memory_limit=None if args.module_memory_limit is None else int(args.module_memory_limit * 2**20),
+    )
+    if args.jobs < 1:
+        parser.error('--jobs must be a positive number')
+    if (args.jobs > 1 or budget.is_set) and 'fork' not in multiprocessing.get_all_start_methods():
+        parser.error('--jobs and module budgets require "fork" start method which is not supported on this platform')
+    if budget.memory_limit is not None and get_rss(os.getpid()) is None:
+        parser.error('--module-memory-limit requires /proc which is not available on this platform')
 
     # Making sure our module is imported from provided src-root even
     # another version of the module is installed in the system
@@ -48,34 +396,85 @@ def main():
 
     if args.modules_aliases:
         with open(args.modules_aliases) as f:
-            modules_aliases_mapping = json.load(f)
-
-    for module_name, module in traverse_modules(args.module_root, args.src_root):
-        dst_path = module.__file__.replace(args.src_root, args.output_dir) + 'i'
-
-        # Normalizing paths before comparison
-        dst_path = os.path.abspath(dst_path)
-        src_path = os.path.abspath(module.__file__)
-        assert src_path != dst_path, f'Attempting to override source file {module.__file__}'
-
-        # Ensuring dst directory exists
-        dst_dir = os.path.dirname(dst_path)
-        os.makedirs(dst_dir, exist_ok=True)
-
-        # Actually creating a file
-        print(f'{module_name} -> {dst_path}')
-        with open(dst_path, 'w') as stub_flo:
-            builder = RepresentationsTreeBuilder(
-                module_name=module_name,
-                module=module,
-                module_root=args.module_root,
-                described_objects=args.described_objects and described_objects,
-                modules_aliases_mapping=args.modules_aliases and modules_aliases_mapping,
-            )
+            modules_aliases_mapping = ModulesAliasesMapping(json.load(f))
+
+    # Taking a snapshot of source files before generating stubs so that changes made in the meantime are not missed
+    watcher = SourcesWatcher(args.src_root) if args.watch else None
+
+    if not args.static:
+        # Importing root module (and walking packages) first so that in parallel mode workers are forked after all the
+        # shared dependencies are imported
+        with timings.measure(args.module_root, 'import'):
+            import_module(args.module_root)
+    module_names = _get_module_names(args)
+
+    object_index = ObjectIndex()
+    options = dict(
+        module_root=args.module_root,
+        described_objects=args.described_objects and described_objects,
+        modules_aliases_mapping=args.modules_aliases and modules_aliases_mapping,
+        object_index=object_index,
+        introspection_cache=IntrospectionCache(),
+    )
+
+    manifest = StubsManifest.load(args.output_dir) if args.incremental else None
+    common_inputs = get_common_inputs(args.described_objects, args.modules_aliases)
+    dependency_graph = manifest.get_dependency_graph() if manifest is not None else DependencyGraph()
+
+    dst_paths = {}
+    modules_inputs = {}
+    outdated_module_names = set()
+    for module_name in module_names:
+        src_path = _get_module_source_path(module_name, args)
+        dst_paths[module_name] = get_stub_path(src_path, args.src_root, args.output_dir)
+        if manifest is not None:
+            modules_inputs[module_name] = get_module_inputs(src_path, common_inputs)
+            if manifest.is_up_to_date(module_name, dst_paths[module_name], modules_inputs[module_name]):
+                continue
+        outdated_module_names.add(module_name)
+
+    if manifest is not None:
+        # Stubs of up to date modules depending on outdated or removed modules are outdated as well
+        removed_module_names = set(manifest.modules) - set(module_names)
+        affected_module_names = dependency_graph.get_reverse_closure(outdated_module_names | removed_module_names)
+        for module_name in module_names:
+            if module_name not in affected_module_names:
+                logging.info(f'Skipping up to date module {module_name}')
+            elif module_name not in outdated_module_names:
+                logging.info(f'Regenerating module {module_name} depending on changed modules')
+                outdated_module_names.add(module_name)
+        for module_name in removed_module_names:
+            dependency_graph.remove(module_name)
+    tasks = [
+        (module_name, dst_paths[module_name]) for module_name in module_names if module_name in outdated_module_names
+    ]
+
+    loader = StaticModuleLoader(args.module_root, args.src_root, object_index) if args.static else None
+    if loader is not None:
+        _load_modules([module_name for module_name, _ in tasks], loader, timings)
+
+    # Indexing already imported packages before forking so that workers share the index as well
+    for module_name in module_names:
+        if module_name in sys.modules:
+            object_index.add_module(sys.modules[module_name])
+
+    _process_results(
+        _write_stubs(tasks, options, args.jobs, budget, timings), args, manifest, modules_inputs, dependency_graph
+    )
+
+    if manifest is not None:
+        for dst_path in manifest.remove_stale(module_names):
+            print(f'Removed {dst_path}')
+        manifest.save()
+
+    _report_timings(args, timings, time.perf_counter() - started_at)
 
-            viewer = StubViewer()
-            module_view = viewer.view(builder.module_rep)
-            stub_flo.write(module_view)
+    if watcher is not None:
+        sys.stdout.flush()
+        try:
+            _watch(args, watcher, module_names, options, budget, manifest, common_inputs, loader, dependency_graph)
+        except KeyboardInterrupt:
+            pass
 
 
 if __name__ == '__main__':
@@ -0,0 +1,5 @@
+__all__ = [
+    'generate_stubs',
+]
+
+from .api import generate_stubs
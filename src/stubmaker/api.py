@@ -0,0 +1,151 @@
+__all__ = [
+    'generate_stubs',
+    'get_stub_path',
+    'render_stub',
+]
+import io
+import os
+import sys
+from importlib import import_module
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from stubmaker.builder import (
+    IntrospectionCache,
+    ModulesAliasesMapping,
+    ObjectIndex,
+    StaticModuleLoader,
+    find_source_path,
+    iter_module_names,
+    iter_source_module_names,
+    override_module_import_path,
+)
+from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
+from stubmaker.timings import Timings
+from stubmaker.viewers.stub_viewer import StubViewer
+
+
+def get_stub_path(src_path: str, src_root: str, output_dir: str) -> str:
+    dst_path = src_path.replace(src_root, output_dir) + 'i'
+
+    # Normalizing paths before comparison
+    dst_path = os.path.abspath(dst_path)
+    assert os.path.abspath(src_path) != dst_path, f'Attempting to override source file {src_path}'
+    return dst_path
+
+
+def render_stub(
+    module_name: str,
+    module: ModuleType,
+    output: TextIO,
+    module_root: Optional[str] = None,
+    described_objects: Optional[Dict[Any, Tuple[str, str]]] = None,
+    modules_aliases_mapping: Optional[ModulesAliasesMapping] = None,
+    object_index: Optional[ObjectIndex] = None,
+    introspection_cache: Optional[IntrospectionCache] = None,
+    timings: Optional[Timings] = None,
+) -> Set[str]:
+    """Streams the stub of a module to output and returns names of modules of module_root package the stub depends on.
+
+    Building representations and rendering them are measured in timings if provided. An introspection_cache shared by
+    several calls keeps objects of the rendered modules alive, so modules imported again should be removed from it with
+    `IntrospectionCache.remove_module`.
+    """
+
+    if timings is None:
+        timings = Timings()
+
+    with timings.measure(module_name, 'build'):
+        builder = RepresentationsTreeBuilder(
+            module_name=module_name,
+            module=module,
+            module_root=module_root,
+            described_objects=described_objects,
+            modules_aliases_mapping=modules_aliases_mapping,
+            object_index=object_index,
+            introspection_cache=introspection_cache,
+        )
+    with timings.measure(module_name, 'render'):
+        StubViewer().stream(builder.module_rep, output)
+    return builder.get_module_dependencies()
+
+
+def generate_stubs(
+    module_root: str,
+    src_root: str,
+    output_dir: Optional[str] = None,
+    described_objects: Optional[Dict[Any, Tuple[str, str]]] = None,
+    modules_aliases: Optional[Dict[str, str]] = None,
+    static: bool = False,
+    module_names: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Generates stubs of a package in the current process yielding module names along with their stubs.
+
+    Stubs are generated as they are requested, so `dict(generate_stubs(...))` returns a dictionary from module name to
+    its stub. Modules are imported (or built statically) from src_root just as by the `stubmaker` command. Modules that
+    are already imported are not imported again, so stubs can be generated repeatedly without importing the package on
+    every call. Remove the package modules from `sys.modules` to get stubs of changed sources.
+
+    Args:
+        module_root: name to import the package as.
+        src_root: path to the package sources.
+        output_dir: directory to write stubs to. Stubs are not written if not specified.
+        described_objects: a dictionary from objects to tuples of their module and qualname, see the
+            `--described-objects` option of the `stubmaker` command.
+        modules_aliases: a dictionary from module names to their aliases.
+        static: build modules from their source files instead of importing them, see the `--static` option.
+        module_names: names of the package modules to generate stubs of. All the modules found in src_root are used
+            by default.
+    """
+
+    src_root = os.path.abspath(src_root)
+    override_module_import_path(module_root, src_root)
+
+    if module_names is None:
+        if static:
+            module_names = iter_source_module_names(module_root, src_root)
+        else:
+            import_module(module_root)
+            module_names = iter_module_names(module_root, src_root)
+    module_names = list(module_names)
+
+    object_index = ObjectIndex()
+    modules: Dict[str, ModuleType]
+    if static:
+        loader = StaticModuleLoader(module_root, src_root, object_index)
+        modules = {module_name: loader.load(module_name) for module_name in module_names}
+        loader.register_modules()
+    else:
+        modules = {module_name: sys.modules[module_name] for module_name in module_names if module_name in sys.modules}
+    for module in modules.values():
+        object_index.add_module(module)
+
+    modules_aliases_mapping = ModulesAliasesMapping(modules_aliases) if modules_aliases else None
+    introspection_cache = IntrospectionCache()
+    for module_name in module_names:
+        if module_name not in modules:
+            modules[module_name] = import_module(module_name)
+            object_index.add_module(modules[module_name])
+        module = modules[module_name]
+
+        output = io.StringIO()
+        render_stub(
+            module_name,
+            module,
+            output,
+            module_root=module_root,
+            described_objects=described_objects,
+            modules_aliases_mapping=modules_aliases_mapping,
+            object_index=object_index,
+            introspection_cache=introspection_cache,
+        )
+        stub = output.getvalue()
+
+        if output_dir is not None:
+            src_path = find_source_path(module_root, src_root, module_name)
+            dst_path = get_stub_path(src_path, src_root, os.path.abspath(output_dir))
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            with open(dst_path, 'w') as stub_flo:
+                stub_flo.write(stub)
+
+        yield module_name, stub
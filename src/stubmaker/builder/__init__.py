@@ -1,3 +1,23 @@
-__all__ = ['override_module_import_path', 'traverse_modules']
+__all__ = [
+    'find_source_path',
+    'iter_module_names',
+    'iter_source_module_names',
+    'override_module_import_path',
+    'traverse_modules',
+    'IntrospectionCache',
+    'ModulesAliasesMapping',
+    'ObjectIndex',
+    'StaticModuleLoader',
+]
 
-from .import_ import override_module_import_path, traverse_modules
+from .import_ import (
+    find_source_path,
+    iter_module_names,
+    iter_source_module_names,
+    override_module_import_path,
+    traverse_modules,
+)
+from .introspection_cache import IntrospectionCache
+from .modules_aliases import ModulesAliasesMapping
+from .object_index import ObjectIndex
+from .static import StaticModuleLoader
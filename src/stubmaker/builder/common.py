@@ -1,10 +1,19 @@
 import inspect
-from typing import Optional, get_type_hints, TYPE_CHECKING
+import logging
+import sys
+import typing
+
+import docstring_parser
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union, get_type_hints, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from stubmaker.builder.definitions import AttributeAnnotationDef, DocumentationDef
 
 
+logger = logging.getLogger(__file__)
+
+
 class Node:
     """Object data used in BaseRepresentation type.
 
@@ -17,6 +26,8 @@ class Node:
         qualname: qualname of obj.
     """
 
+    __slots__ = ('namespace', 'name', 'obj', 'module_name', 'qualname')
+
     def __init__(
         self,
         namespace: str,
@@ -37,6 +48,10 @@ class Node:
 
 
 class BaseRepresentation:
+    # Representations (and nodes) are slotted as a big module may have hundreds of thousands of them. Subclasses that
+    # do not define __slots__ get __dict__ and may set arbitrary attributes as usual
+    __slots__ = ('node', 'tree')
+
     def __init__(self, node: Node, tree: 'BaseRepresentationsTreeBuilder'):
         self.node = node
         self.tree = tree
@@ -71,10 +86,39 @@ class BaseRepresentation:
 
 
 class BaseLiteral(BaseRepresentation):
-    pass
+    __slots__ = ()
+
+
+class LazyMembers(Mapping):
+    """Mapping from member names to representations that are built on first access.
+
+    Parameters:
+        factories: a dictionary from member name to a function building representation of the member.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], BaseRepresentation]]):
+        self._factories = factories
+        self._members: Dict[str, BaseRepresentation] = {}
+
+    def __getitem__(self, name: str) -> BaseRepresentation:
+        member = self._members.get(name)
+        if member is None:
+            member = self._members[name] = self._factories[name]()
+        return member
+
+    def __contains__(self, name) -> bool:
+        return name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
 
 
 class BaseDefinition(BaseRepresentation):
+    __slots__ = ()
+
     def get_node_for_member(self, member_name: str) -> Node:
         return self.tree.create_node_for_object(
             namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name if self.name else '',
@@ -141,6 +185,49 @@ class BaseRepresentationsTreeBuilder:
     def get_literal_for_value(self, obj: Node) -> BaseLiteral:
         raise NotImplementedError
 
+    # Introspection of objects. These results do not depend on namespace and may be cached by implementations
+
+    def get_signature(self, func) -> inspect.Signature:
+        return inspect.signature(func)
+
+    def get_type_hints(self, func, globalns: Optional[dict]) -> dict:
+        """Returns evaluated annotations of func. Evaluation errors are logged and raised"""
+
+        try:
+            return get_type_hints(func, globalns)
+        except (NameError, TypeError) as exc:
+            logger.warning(f'Failed to evaluate forward reference for {func}: {exc}')
+            raise
+
+    def get_type_hint_origin_and_args(self, type_hint) -> Tuple[Any, typing.Sequence, bool]:
+        return get_type_hint_origin_and_args(type_hint)
+
+    def get_parsed_docstring(self, docstring: str) -> docstring_parser.Docstring:
+        return docstring_parser.google.parse(docstring)
+
+    def are_almost_same(self, left, right, compare: Callable[[Any, Any], bool]) -> bool:
+        """Compares class members, e.g. a method and the method of the base class it overrides"""
+        return compare(left, right)
+
+    def get_inherited_attributes(self, cls: type) -> typing.Mapping[str, Any]:
+        """Returns attributes cls inherits from its bases as they are stored in `__dict__`s along its MRO"""
+        return get_mro_attributes(cls.__mro__[1:])
+
+    def get_annotations(self, obj, eval_str: bool) -> dict:
+        return get_annotations(obj, eval_str)
+
+
+def get_mro_attributes(mro: typing.Sequence[type]) -> Dict[str, Any]:
+    """Returns attributes found in `__dict__`s of classes of mro. Attributes of classes coming earlier in mro take
+    precedence just as on attribute access. Descriptors are not invoked, so the result is the same as of
+    `inspect.getattr_static` for every name
+    """
+
+    attributes: Dict[str, Any] = {}
+    for cls in reversed(mro):
+        attributes.update(vars(cls))
+    return attributes
+
 
 def get_annotations(obj, eval_str):
     if eval_str:
@@ -154,6 +241,58 @@ def get_annotations(obj, eval_str):
     return getattr(obj, '__annotations__', {})
 
 
+class _SingleClassMRO:
+    """Pretends to be a class with cls being the only entry of its MRO.
+
+    `typing.get_type_hints` evaluates annotations of every class of the MRO separately (with globals of the module the
+    class is defined in) and merges the results. Passing this object instead of a class makes it evaluate annotations
+    of cls only, exactly as it does for cls as a part of any MRO.
+    """
+
+    def __init__(self, cls: type):
+        self.__mro__ = (cls,)
+
+    @property  # type: ignore
+    def __class__(self):
+        return type
+
+
+def get_own_annotations(cls: type, eval_str: bool) -> dict:
+    """Returns annotations cls itself contributes to `get_annotations` of any class having cls in its MRO"""
+
+    if eval_str:
+        return get_type_hints(_SingleClassMRO(cls))
+    return getattr(cls, '__annotations__', {})
+
+
+class _AnnotationsOverride:
+    """Stands for obj with its annotations replaced, so `typing.get_type_hints` handles them as annotations of obj
+    (e.g. annotations of parameters defaulting to None are wrapped in Optional on Python versions prior to 3.11)
+    """
+
+    def __init__(self, obj, annotations: dict):
+        self._obj = obj
+        self.__annotations__ = annotations
+
+    def __getattr__(self, name):
+        return getattr(self._obj, name)
+
+
+def evaluate_forward_reference(annotation: str, globalns: dict):
+    """Evaluates a string annotation of a function defined in the module with globalns"""
+    return get_type_hints(_AnnotationsOverride(None, {'return': annotation}), globalns)['return']
+
+
+def get_function_type_hints(func, globalns: dict, evaluate: Callable[[str], Any]) -> dict:
+    """Same as `typing.get_type_hints(func, globalns)` with string annotations evaluated by evaluate"""
+
+    annotations = {
+        name: evaluate(annotation) if isinstance(annotation, str) else annotation
+        for name, annotation in func.__annotations__.items()
+    }
+    return get_type_hints(_AnnotationsOverride(func, annotations), globalns)
+
+
 def get_type_name(obj):
     if hasattr(obj, '__name__'):
         return obj.__name__
@@ -161,3 +300,44 @@ def get_type_name(obj):
     if hasattr(obj, '_name'):
         return obj._name
     return None
+
+
+def get_type_hint_origin_and_args(type_hint) -> Tuple[Any, typing.Sequence, bool]:
+    """Splits type hint to its origin and arguments.
+
+    Returns:
+        Tuple of origin, arguments and a flag that is True if the first argument is the list of Callable parameters.
+    """
+
+    # Python < 3.9 support for generic types without arguments
+    is_special = getattr(type_hint, '_special', False)
+
+    # typing.get_args works with Callable[[], int] but does not work with
+    # Callable in Python 3.8. So __args__ seems more reliable
+    args: typing.Sequence
+    if not is_special:
+        args = getattr(type_hint, '__args__', ())
+    else:
+        args = ()
+
+    # get origin of generic type
+    if getattr(type_hint, '_name', None):
+        # If has _name ignore __origin__ field and get origin directly from types module. This is necessary for
+        # typing aliases (e.g. __origin__ of List[int] is list instead of typing.List).
+        origin = getattr(typing, type_hint._name)
+        if sys.version_info >= (3, 10) and origin is Optional:
+            origin = Union
+    else:
+        # Fallback to using __origin__. For non-generic types (e.g. List without arguments) retrieve object itself.
+        origin = getattr(type_hint, '__origin__', type_hint)
+
+    has_callable_parameters = False
+    if origin is Callable and len(args) > 0 and args[0] is not Ellipsis:
+        args = (list(args[:-1]), args[-1])
+        has_callable_parameters = True
+    elif origin is Union and type(None) in args and len(args) == 2:  # noqa: E721
+        origin = Optional
+        args = [arg for arg in args if arg is not type(None)]  # noqa: E721
+
+    args = [None if arg is type(None) else arg for arg in args]  # noqa: E721
+    return origin, args, has_callable_parameters
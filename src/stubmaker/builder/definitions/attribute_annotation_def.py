@@ -4,6 +4,8 @@ from stubmaker.builder.common import Node, BaseDefinition, BaseRepresentationsTr
 class AttributeAnnotationDef(BaseDefinition):
     """Represents `name: annotation`"""
 
+    __slots__ = ('annotation',)
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
         # we don't want to associate annotation object with name (e.g. TypeVar used in annotation shouldn't be accessed
@@ -4,6 +4,8 @@ from stubmaker.builder.common import Node, BaseDefinition, BaseRepresentationsTr
 class AttributeDef(BaseDefinition):
     """Represents `name = value`"""
 
+    __slots__ = ('value',)
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
         self.value = self.tree.get_literal(node)
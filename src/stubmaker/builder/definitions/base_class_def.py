@@ -1,8 +1,15 @@
+import functools
 import inspect
 from abc import abstractmethod
-from typing import TypeVar, cast
-
-from stubmaker.builder.common import BaseDefinition, BaseRepresentationsTreeBuilder, Node, get_annotations
+from typing import Callable, Dict, TypeVar, cast
+
+from stubmaker.builder.common import (
+    BaseDefinition,
+    BaseRepresentation,
+    BaseRepresentationsTreeBuilder,
+    LazyMembers,
+    Node,
+)
 from stubmaker.builder.definitions.function_def import FunctionDef
 from typing_inspect import get_generic_bases, is_generic_type
 
@@ -31,6 +38,8 @@ def _try_patch_pydantic_init_signature(cls):
 
 
 class BaseClassDef(BaseDefinition):
+    __slots__ = ('metaclass', 'bases', 'members', 'annotations')
+
     # TODO:  support properties
 
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
@@ -48,49 +57,77 @@ class BaseClassDef(BaseDefinition):
             for base in bases:
                 self.bases.append(self.tree.get_literal(self.tree.create_node_for_object(self.namespace, None, base)))
 
-        self.members = {}
+        # Member names are found (and compared to those of bases) right away, definitions are built on first access.
+        # Note that viewers traverse all the members of module classes, so all of them are built once the module is
+        # rendered
+        member_factories: Dict[str, Callable[[], BaseRepresentation]] = {}
         for member_name in self.get_public_member_names():
-            # Accessing members through getattr_static is important in order to be able
-            # to distinguish between methods, classmethods and staticmethods
-            member = inspect.getattr_static(self.obj, member_name)
-
-            def member_node_factory(obj):
-                return self.tree.create_node_for_object(
-                    namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name if self.name else '',
-                    name=member_name,
-                    obj=obj,
-                )
+            # Accessing members as they are stored in __dict__ (like getattr_static does) is important in order to be
+            # able to distinguish between methods, classmethods and staticmethods
+            member = self._get_attribute(member_name)
 
             if isinstance(member, staticmethod):
-                definition = self.tree.get_static_method_definition(member_node_factory(member.__func__))
+                get_definition, member = self.tree.get_static_method_definition, member.__func__
             elif isinstance(member, classmethod):
-                definition = self.tree.get_class_method_definition(member_node_factory(member.__func__))
+                get_definition, member = self.tree.get_class_method_definition, member.__func__
             elif inspect.isfunction(member):
-                definition = self.tree.get_function_definition(member_node_factory(member))
+                get_definition = self.tree.get_function_definition
             elif inspect.isclass(member) and member.__module__ == self.tree.module_name:
-                definition = self.tree.get_class_definition(member_node_factory(member))
+                get_definition = self.tree.get_class_definition
             elif isinstance(member, TypeVar):
-                definition = self.tree.get_attribute_definition(member_node_factory(member))
+                get_definition = self.tree.get_attribute_definition
             else:
                 continue
 
-            self.members[member_name] = definition
+            member_factories[member_name] = functools.partial(
+                self._get_member_definition, get_definition, member_name, member
+            )
+        self.members = LazyMembers(member_factories)
 
-        self.annotations = {}
-        annotations = get_annotations(self.obj, eval_str=not tree.preserve_forward_references)
-        for member_name, annotation in annotations.items():
-            self.annotations[member_name] = self.tree.get_attribute_annotation_definition(
-                self.tree.create_node_for_object(
-                    namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name,
-                    name=member_name,
-                    obj=annotations[member_name],
+        annotations = tree.get_annotations(self.obj, eval_str=not tree.preserve_forward_references)
+        self.annotations = LazyMembers(
+            {
+                member_name: functools.partial(
+                    self._get_member_definition, self.tree.get_attribute_annotation_definition, member_name, annotation
                 )
+                for member_name, annotation in annotations.items()
+            }
+        )
+
+    def _get_member_definition(
+        self, get_definition: Callable[[Node], BaseDefinition], member_name: str, obj
+    ) -> BaseDefinition:
+        return get_definition(
+            self.tree.create_node_for_object(
+                namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name if self.name else '',
+                name=member_name,
+                obj=obj,
             )
+        )
 
     @property
     def init_method(self) -> FunctionDef:
         return cast(FunctionDef, self.members['__init__'])
 
+    def _get_attribute(self, name: str):
+        """Returns an attribute of the class as it is stored in `__dict__` of the class or of its base"""
+
+        own_attributes = vars(self.obj)
+        if name in own_attributes:
+            return own_attributes[name]
+        return self.tree.get_inherited_attributes(self.obj)[name]
+
+    def _resolve_attribute(self, attribute):
+        """Returns the result of accessing an attribute stored in `__dict__` through the class. Only static and class
+        methods are resolved: arbitrary descriptors are not invoked as it may have side effects
+        """
+
+        if isinstance(attribute, staticmethod):
+            return attribute.__func__
+        if isinstance(attribute, classmethod):
+            return attribute.__get__(None, self.obj)
+        return attribute
+
     def get_public_member_names(self):
         cls = self.obj
 
@@ -98,10 +135,18 @@ class BaseClassDef(BaseDefinition):
         if hasattr(cls, '_variant_registry'):
             var_reg = cls._variant_registry
 
-        names = set()
+        own_attributes = vars(cls)
+        inherited_attributes = self.tree.get_inherited_attributes(cls)
 
-        for name in dir(cls):
-            if name.startswith('__') and not inspect.isfunction(getattr(cls, name, None)):
+        # An inherited attribute is accessed through the class the same way as through its base, so only attributes of
+        # cls itself may be redefined in it. The only exception is __init__ that may be always included in classes
+        names = list(own_attributes)
+        if '__init__' not in own_attributes and '__init__' in inherited_attributes:
+            names.append('__init__')
+
+        for name in names:
+            cls_attr = self._resolve_attribute(self._get_attribute(name))
+            if name.startswith('__') and not inspect.isfunction(cls_attr):
                 continue
 
             if var_reg and name == var_reg.field:
@@ -111,22 +156,13 @@ class BaseClassDef(BaseDefinition):
                 continue
 
             # Only considering members that were actually (re)defined in cls
-            if self._is_redefined_in_current_class(name):
-                names.add(name)
-
-        ordered_names = []
-        for name in cls.__dict__:
-            if name in names:
-                ordered_names.append(name)
-                names.remove(name)
-
-        for name in names:
-            ordered_names.append(name)
-
-        yield from ordered_names
-
-        # return [name for name in dir(self.obj) if not name.startswith('__') and name != '__init__']
+            super_cls_attr = self._resolve_attribute(inherited_attributes.get(name))
+            if self._is_redefined_in_current_class(name, cls_attr, super_cls_attr):
+                yield name
 
     @abstractmethod
-    def _is_redefined_in_current_class(self, name):
+    def _is_redefined_in_current_class(self, name, cls_attr, super_cls_attr):
+        """Checks if cls_attr is redefined in the class. Attributes are passed the way they are accessed through the
+        class and its base, super_cls_attr is None if the base has no such attribute
+        """
         raise NotImplementedError
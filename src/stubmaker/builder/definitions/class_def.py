@@ -1,9 +1,9 @@
-import inspect
-
 from .base_class_def import BaseClassDef
 
 
 class ClassDef(BaseClassDef):
+    __slots__ = ()
+
     def get_public_member_names(self):
         yield from (
             name
@@ -11,18 +11,19 @@ class ClassDef(BaseClassDef):
             if not name.startswith('_') or name.startswith('__') and name.endswith('__')
         )
 
-    def _is_redefined_in_current_class(self, name):
+    def _is_redefined_in_current_class(self, name, cls_attr, super_cls_attr):
         if self.tree.always_include_init and name == '__init__':
             return True
 
-        cls_attr = getattr(self.obj, name)
-        super_cls = super(self.obj, self.obj)
-        super_cls_attr = getattr(super_cls, name, None)
         # check if function descriptor is actually redefined (i.e. classmethods and staticmethods)
         if hasattr(cls_attr, '__func__') and hasattr(super_cls_attr, '__func__'):
             cls_attr = getattr(cls_attr, '__func__')
             super_cls_attr = getattr(super_cls_attr, '__func__')
-        return not self._are_almost_same(cls_attr, super_cls_attr)
+        if super_cls_attr is None:
+            # Not caching members missing from bases, so that the cache doesn't keep values of all the attributes alive
+            return not self._are_almost_same(cls_attr, super_cls_attr)
+        # Verdicts depend on the members only, so they are shared by all the subclasses inheriting the same members
+        return not self.tree.are_almost_same(cls_attr, super_cls_attr, self._are_almost_same)
 
     def _are_almost_same(self, left, right):
         if callable(left) and callable(right):
@@ -31,8 +32,8 @@ class ClassDef(BaseClassDef):
             # less strict ad-hoc check in case of magic methods (except for __init__)
             if left.__name__.startswith('__') and left.__name__.endswith('__') and left.__name__ != '__init__':
                 try:
-                    left_signature = inspect.signature(left)
-                    right_signature = inspect.signature(right)
+                    left_signature = self.tree.get_signature(left)
+                    right_signature = self.tree.get_signature(right)
                 except ValueError:
                     # skip builtin methods without signature
                     return True
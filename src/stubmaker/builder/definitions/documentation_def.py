@@ -1,8 +1,11 @@
-import docstring_parser
-
 from stubmaker.builder.common import BaseDefinition
 
 
 class DocumentationDef(BaseDefinition):
+    __slots__ = ()
+
     def get_parsed(self):
-        return docstring_parser.google.parse(self.obj)
+        """Returns the parsed docstring. It is parsed once per run and shared by all callers, so it should not be
+        modified
+        """
+        return self.tree.get_parsed_docstring(self.obj)
@@ -4,6 +4,8 @@ from stubmaker.builder.common import Node, BaseDefinition, BaseRepresentationsTr
 
 
 class EnumDef(BaseDefinition):
+    __slots__ = ('bases', 'enum_dict')
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
         assert issubclass(node.obj, Enum)
@@ -1,26 +1,24 @@
 import inspect
-import logging
 import sys
-from typing import Optional, get_type_hints
+from typing import Optional
 
 from stubmaker.builder.common import BaseDefinition, Node, BaseRepresentationsTreeBuilder
 
 
-logger = logging.getLogger(__file__)
-
-
 class FunctionDef(BaseDefinition):
+    __slots__ = ('signature', 'is_async')
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
 
-        signature = inspect.signature(self.obj)
+        signature = tree.get_signature(self.obj)
         if not tree.preserve_forward_references:
             module = sys.modules.get(self.obj.__module__)
             try:
                 globalns = None if module is None else module.__dict__
-                annotations = get_type_hints(self.obj, globalns)
-            except (NameError, TypeError) as exc:
-                logger.warning(f'Failed to evaluate forward reference for {self.obj}: {exc}')
+                annotations = tree.get_type_hints(self.obj, globalns)
+            except (NameError, TypeError):
+                # Logged by the tree
                 annotations = self.obj.__annotations__
 
         params = []
@@ -55,8 +53,8 @@ class FunctionDef(BaseDefinition):
 
 
 class ClassMethodDef(FunctionDef):
-    pass
+    __slots__ = ()
 
 
 class StaticMethodDef(FunctionDef):
-    pass
+    __slots__ = ()
@@ -1,4 +1,5 @@
 import builtins
+import functools
 import inspect
 from collections import defaultdict
 from typing import DefaultDict, Dict, Mapping, Set, Tuple, Optional, Callable, TypeVar, Iterable, Any
@@ -8,13 +9,15 @@ from stubmaker.builder.common import (
     BaseDefinition,
     BaseRepresentationsTreeBuilder,
     BaseRepresentation,
-    get_annotations,
+    LazyMembers,
     get_type_name,
 )
 from stubmaker.builder.literals import TypeHintLiteral, TypeVarLiteral, ReferenceLiteral
 
 
 class ModuleDef(BaseDefinition):
+    __slots__ = ('members',)
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
 
@@ -43,14 +46,21 @@ class ModuleDef(BaseDefinition):
     def get_imports(
         self, used_object_ids: Set[int], traverse_method: Callable[[BaseRepresentation], Iterable[BaseRepresentation]]
     ) -> Tuple[Set[str], Mapping[str, Set[Tuple[str, Optional[str]]]]]:
+        imports = self.get_imports_for_representations(
+            curr for curr in traverse_method(self) if curr.id in used_object_ids
+        )
+        return imports, self.get_from_imports_for_all()
+
+    def get_imports_for_representations(self, representations: Iterable[BaseRepresentation]) -> Set[str]:
         imports = set()
-        from_imports: DefaultDict[str, Set[Tuple[str, Optional[str]]]] = defaultdict(set)
+        for representation in representations:
+            import_module = self.get_import_module_for_representation(representation)
+            if import_module:
+                imports.add(import_module)
+        return imports
 
-        for curr in traverse_method(self):
-            if curr.id in used_object_ids:
-                import_module = self.get_import_module_for_representation(curr)
-                if import_module:
-                    imports.add(import_module)
+    def get_from_imports_for_all(self) -> Mapping[str, Set[Tuple[str, Optional[str]]]]:
+        from_imports: DefaultDict[str, Set[Tuple[str, Optional[str]]]] = defaultdict(set)
 
         # try to add unused but specified in __all__ dependencies
         for member_name in self.obj.__all__:
@@ -75,11 +85,11 @@ class ModuleDef(BaseDefinition):
                     assert member_repr.module_name is not None, 'Module members should have module_name'
                     from_imports[member_repr.module_name].add((member_name, None))
 
-        return imports, from_imports
+        return from_imports
 
     def get_public_module_member_objects(self) -> Dict[str, Any]:
         member_objects = dict(self.obj.__dict__)
-        annotations = get_annotations(self.obj, eval_str=not self.tree.preserve_forward_references)
+        annotations = self.tree.get_annotations(self.obj, eval_str=not self.tree.preserve_forward_references)
         for member_name in annotations:
             # try to add module level attributes with annotations but without value that are specified in __all__
             # (such attributes can't be retrieved from __dict__)
@@ -89,7 +99,7 @@ class ModuleDef(BaseDefinition):
             member_name: member for member_name, member in member_objects.items() if not member_name.startswith('__')
         }
 
-    def _get_members_defined_in_current_module(self, members: Mapping[str, BaseRepresentation]):
+    def _get_members_defined_in_current_module(self, members: Mapping[str, Node]) -> Dict[str, Node]:
         local_members = {}
         for member_name, member in members.items():
             if member is None or inspect.ismodule(member.obj):
@@ -106,10 +116,18 @@ class ModuleDef(BaseDefinition):
             local_members[member_name] = member
         return local_members
 
-    def get_members_representations(self) -> Dict[str, BaseRepresentation]:
+    def get_members_representations(self) -> Mapping[str, BaseRepresentation]:
+        """Returns representations of members defined in the module.
+
+        Representations are built on first access. Imported members are filtered out without building their
+        representations, while members defined in the module are all built once the module is rendered (see
+        BasicViewer.get_used_members_ids).
+        """
+
         member_objects = self.get_public_module_member_objects()
-        annotations = get_annotations(self.obj, eval_str=not self.tree.preserve_forward_references)
-        members: Dict[str, BaseRepresentation] = {}
+        annotations = self.tree.get_annotations(self.obj, eval_str=not self.tree.preserve_forward_references)
+        member_nodes: Dict[str, Node] = {}
+        member_factories: Dict[str, Callable[[Node], BaseRepresentation]] = {}
 
         for member_name in annotations:
             # try to add module level attributes with annotations but without value that are specified in __all__
@@ -121,18 +139,23 @@ class ModuleDef(BaseDefinition):
             # check if member is alias
             if get_type_name(member_object) != member_name:
                 if member_name in annotations:
-                    members[member_name] = self.tree.get_attribute_annotation_definition(
-                        self.tree.create_node_for_object(
-                            namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name,
-                            name=member_name,
-                            obj=annotations[member_name],
-                        )
+                    member_nodes[member_name] = self.tree.create_node_for_object(
+                        namespace=f'{self.namespace}.{self.name}' if self.namespace else self.name,
+                        name=member_name,
+                        obj=annotations[member_name],
                     )
+                    member_factories[member_name] = self.tree.get_attribute_annotation_definition
                 else:
-                    members[member_name] = self.tree.get_attribute_definition(self.get_node_for_member(member_name))
+                    member_nodes[member_name] = self.get_node_for_member(member_name)
+                    member_factories[member_name] = self.tree.get_attribute_definition
             else:
-                node = self.get_node_for_member(member_name)
-                definition = self.tree.get_definition(node)
-                members[member_name] = definition
-
-        return self._get_members_defined_in_current_module(members)
+                member_nodes[member_name] = self.get_node_for_member(member_name)
+                member_factories[member_name] = self.tree.get_definition
+
+        # Imported members are filtered out by their nodes so that their definitions are never built
+        return LazyMembers(
+            {
+                member_name: functools.partial(member_factories[member_name], node)
+                for member_name, node in self._get_members_defined_in_current_module(member_nodes).items()
+            }
+        )
@@ -5,11 +5,31 @@ from importlib import import_module
 from importlib.abc import MetaPathFinder
 from importlib.machinery import ModuleSpec
 from importlib.util import resolve_name, spec_from_file_location
-from pkgutil import walk_packages
+from pkgutil import iter_modules, walk_packages
 
 from _frozen_importlib_external import _NamespaceLoader  # type: ignore
 
 
+def find_source_path(module_root, sources_path, module_name):
+    """Returns a path to the source file of module_name if it is module_root or its submodule found in sources_path"""
+
+    # Checking if module_name is module_root or its submodule
+    if module_name == module_root:
+        path_prefix = sources_path
+    elif module_name.startswith(module_root + '.'):
+        tokens = module_name[len(module_root) + 1 :].split('.')
+        path_prefix = os.path.join(sources_path, *tokens)
+    else:
+        return None
+
+    # Trying to guess a file
+    if os.path.exists(path_prefix + '.py'):
+        return path_prefix + '.py'
+    if os.path.exists(os.path.join(path_prefix, '__init__.py')):
+        return os.path.join(path_prefix, '__init__.py')
+    return None
+
+
 class SourceFinder(MetaPathFinder):
     def __init__(self, module_root, sources_path):
         self.sources_path = sources_path
@@ -19,21 +39,8 @@ class SourceFinder(MetaPathFinder):
         # To absolute import
         fullname = resolve_name(fullname, path)
 
-        # Checking if fullname is module_root or its submodule
-        if fullname == self.module_root:
-            path_prefix = self.sources_path
-        elif fullname.startswith(self.module_root + '.'):
-            tokens = fullname[len(self.module_root) + 1 :].split('.')
-            path_prefix = os.path.join(self.sources_path, *tokens)
-        else:
-            return None
-
-        # Trying to guess a file
-        if os.path.exists(path_prefix + '.py'):
-            path = path_prefix + '.py'
-        elif os.path.exists(os.path.join(path_prefix, '__init__.py')):
-            path = os.path.join(path_prefix, '__init__.py')
-        else:
+        path = find_source_path(self.module_root, self.sources_path, fullname)
+        if path is None:
             return None
 
         # Creating spec from a file
@@ -54,18 +61,65 @@ class VirtualPackageFinder(MetaPathFinder):
 
 
 def override_module_import_path(module, sources_path):
+    """Makes module get imported from sources_path. Finders installed for module by previous calls are replaced, so the
+    function may be called repeatedly (e.g. once per generate_stubs call) without growing sys.meta_path
+    """
+
+    sys.meta_path[:] = [
+        finder
+        for finder in sys.meta_path
+        if not isinstance(finder, (SourceFinder, VirtualPackageFinder)) or finder.module_root != module
+    ]
     sys.meta_path.insert(0, SourceFinder(module, sources_path))
     sys.meta_path.append(VirtualPackageFinder(module))
 
 
-def traverse_modules(module_root, sources_path, skip_modules=None):
+def iter_module_names(module_root, sources_path, skip_modules=None):
+    """Yields names of module_root and all its submodules found in sources_path.
+
+    Only packages are imported while walking sources_path (in order to find their submodules), plain modules are not.
+    """
+
     if skip_modules and module_root in skip_modules:
         logging.info(f'Skipping module {module_root}')
     else:
-        yield module_root, import_module(module_root)
+        yield module_root
 
     for _, module_name, _ in walk_packages([sources_path], prefix=module_root + '.'):
         if skip_modules and module_name in skip_modules:
             logging.info(f'Skipping module {module_name}')
         else:
-            yield module_name, import_module(module_name)
+            yield module_name
+
+
+def iter_source_module_names(module_root, sources_path, skip_modules=None):
+    """Yields names of module_root and all its submodules found in sources_path without importing any of them.
+
+    Names are yielded in the same order as by iter_module_names.
+    """
+
+    if skip_modules and module_root in skip_modules:
+        logging.info(f'Skipping module {module_root}')
+    else:
+        yield module_root
+
+    yield from _iter_source_submodule_names(sources_path, module_root + '.', skip_modules)
+
+
+def _iter_source_submodule_names(path, prefix, skip_modules):
+    for _, module_name, is_package in iter_modules([path], prefix):
+        if skip_modules and module_name in skip_modules:
+            logging.info(f'Skipping module {module_name}')
+        else:
+            yield module_name
+        if is_package:
+            package_path = os.path.join(path, module_name[len(prefix) :])
+            yield from _iter_source_submodule_names(package_path, module_name + '.', skip_modules)
+
+
+def traverse_modules(module_root, sources_path, skip_modules=None, object_index=None):
+    for module_name in iter_module_names(module_root, sources_path, skip_modules):
+        module = import_module(module_name)
+        if object_index is not None:
+            object_index.add_module(module)
+        yield module_name, module
@@ -0,0 +1,291 @@
+import inspect
+import logging
+from types import MethodType, ModuleType
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Type, get_type_hints
+
+import docstring_parser
+
+from stubmaker.builder.common import (
+    evaluate_forward_reference,
+    get_annotations,
+    get_function_type_hints,
+    get_mro_attributes,
+    get_own_annotations,
+    get_type_hint_origin_and_args,
+)
+
+logger = logging.getLogger(__file__)
+
+
+class _FailedForwardReference(Exception):
+    """Raised by IntrospectionCache._evaluate_forward_reference with the error it has already logged"""
+
+    def __init__(self, error: Exception):
+        super().__init__(error)
+        self.error = error
+
+
+def _is_defined_in(obj, module_name: str) -> bool:
+    """Returns whether obj is the module, its globals, an object defined in it or a type hint referring to one"""
+
+    if isinstance(obj, ModuleType):
+        return obj.__name__ == module_name
+    if isinstance(obj, dict):
+        return obj.get('__name__') == module_name
+    if getattr(obj, '__module__', None) == module_name:
+        return True
+    args = getattr(obj, '__args__', None)
+    return isinstance(args, tuple) and any(_is_defined_in(arg, module_name) for arg in args)
+
+
+class IntrospectionCache:
+    """Run-scoped cache of namespace-independent introspection results.
+
+    Representations are bound to the namespace they are created in, so the same object imported by several modules gets
+    a separate representation in every module. Data such representations are built from (signatures, evaluated
+    annotations, origins and arguments of type hints) depends on the object only and is computed once per run. Results
+    are keyed by object identity and objects are kept alive by the cache so their ids can't be reused. Parsed docstrings
+    are keyed by docstring text and are shared by all the callers, so they should not be modified.
+
+    Since objects are kept alive, a module imported again while the cache is used (e.g. in watch mode or by repeated
+    `generate_stubs` calls sharing a cache) should be removed from the cache with `remove_module` along with the modules
+    depending on it. Otherwise results for the previous version of the module are kept (and never hit) for as long as
+    the cache lives. `clear` forgets all the results.
+    """
+
+    def __init__(self):
+        self._signatures: Dict[int, Tuple[Any, Tuple[Optional[inspect.Signature], Optional[Exception]]]] = {}
+        self._type_hints: Dict[int, Tuple[Any, Tuple[Optional[dict], Optional[Exception]]]] = {}
+        # Evaluated string annotations of functions by module globals
+        self._forward_references: Dict[int, Tuple[Any, Dict[str, Tuple[Any, Optional[Exception]]]]] = {}
+        self._type_hint_components: Dict[int, Tuple[Any, Tuple[Any, Sequence, bool]]] = {}
+        self._parsed_docstrings: Dict[str, docstring_parser.Docstring] = {}
+        # Keyed by ids of compared objects, whether they are bound methods and the comparison function
+        self._almost_same: Dict[Tuple[int, bool, int, bool, Callable], Tuple[Any, Any, bool]] = {}
+        self._class_attributes: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self._inherited_attributes: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        # Keyed by eval_str
+        self._annotations: Dict[bool, Dict[int, Tuple[Any, Tuple[Optional[dict], Optional[Exception]]]]] = {
+            False: {},
+            True: {},
+        }
+        self._own_annotations: Dict[bool, Dict[int, Tuple[Any, Tuple[Optional[dict], Optional[Exception]]]]] = {
+            False: {},
+            True: {},
+        }
+
+    def _iter_object_storages(self) -> Iterator[Dict[int, Tuple[Any, Any]]]:
+        yield self._signatures
+        yield self._type_hints
+        yield self._forward_references
+        yield self._type_hint_components
+        yield self._class_attributes
+        yield self._inherited_attributes
+        yield from self._annotations.values()
+        yield from self._own_annotations.values()
+
+    def __len__(self):
+        return sum(map(len, self._iter_object_storages())) + len(self._almost_same) + len(self._parsed_docstrings)
+
+    def clear(self):
+        for storage in self._iter_object_storages():
+            storage.clear()
+        self._almost_same.clear()
+        self._parsed_docstrings.clear()
+
+    def remove_module(self, module_name: str):
+        """Forgets results for a module and objects defined in it, e.g. once the module is unloaded to be imported again
+
+        Results for objects of other modules may be computed from the objects of the module (e.g. attributes of
+        subclasses), so modules depending on the module should be removed as well.
+        """
+
+        for storage in self._iter_object_storages():
+            for object_id, (obj, _) in list(storage.items()):
+                if _is_defined_in(obj, module_name):
+                    del storage[object_id]
+        for key, (left, right, _) in list(self._almost_same.items()):
+            if _is_defined_in(left, module_name) or _is_defined_in(right, module_name):
+                del self._almost_same[key]
+
+    @staticmethod
+    def _get_or_compute(storage: Dict[int, Tuple[Any, Any]], obj, compute: Callable[[Any], Any]):
+        entry = storage.get(id(obj))
+        if entry is None:
+            entry = storage[id(obj)] = (obj, compute(obj))
+        return entry[1]
+
+    @classmethod
+    def _get_or_raise(
+        cls,
+        storage: Dict[int, Tuple[Any, Tuple[Any, Optional[Exception]]]],
+        obj,
+        compute: Callable[[Any], Any],
+        errors: Tuple[Type[Exception], ...],
+    ):
+        """Same as _get_or_compute but errors of compute are cached as well and raised on every call"""
+
+        def compute_or_catch(obj):
+            try:
+                return compute(obj), None
+            except errors as exc:
+                return None, exc
+
+        result, exc = cls._get_or_compute(storage, obj, compute_or_catch)
+        if exc is not None:
+            raise exc.with_traceback(None)
+        return result
+
+    def get_signature(self, func) -> inspect.Signature:
+        """Returns the signature of func. Errors (e.g. for builtins without signatures) are cached and raised on every
+        call
+        """
+
+        # Explicitly assigned signatures may be reassigned later (e.g. pydantic models share __init__ with patched
+        # __signature__) so they are not cached
+        if '__signature__' in getattr(func, '__dict__', {}):
+            return inspect.signature(func)
+        return self._get_or_raise(self._signatures, func, inspect.signature, (ValueError, TypeError))
+
+    def get_type_hints(self, func, globalns: Optional[dict]) -> dict:
+        """Returns evaluated annotations of func. Evaluation errors are cached and raised on every call.
+
+        String annotations of functions are evaluated once per module globals, so functions of the same module share
+        evaluated (or failed) strings like `'Optional[Task]'`. A string failed to evaluate is logged as a warning once,
+        later functions annotated with it are logged at debug level.
+        """
+
+        def compute(obj):
+            try:
+                if (
+                    globalns is None
+                    or not inspect.isfunction(obj)
+                    # Such annotations are evaluated with type parameters of the function or not evaluated at all
+                    or getattr(obj, '__type_params__', None)
+                    or getattr(obj, '__no_type_check__', None)
+                ):
+                    return get_type_hints(obj, globalns)
+                return get_function_type_hints(
+                    obj, globalns, lambda annotation: self._evaluate_forward_reference(annotation, globalns, obj)
+                )
+            except _FailedForwardReference as failure:
+                raise failure.error from None
+            except (NameError, TypeError) as exc:
+                logger.warning(f'Failed to evaluate forward reference for {obj}: {exc}')
+                raise
+
+        return self._get_or_raise(self._type_hints, func, compute, (NameError, TypeError))
+
+    def _evaluate_forward_reference(self, annotation: str, globalns: dict, func):
+        forward_references = self._get_or_compute(self._forward_references, globalns, lambda obj: {})
+        entry = forward_references.get(annotation)
+        if entry is None:
+            try:
+                entry = forward_references[annotation] = evaluate_forward_reference(annotation, globalns), None
+            except (NameError, TypeError) as exc:
+                logger.warning(f'Failed to evaluate forward reference {annotation!r} for {func}: {exc}')
+                entry = forward_references[annotation] = None, exc
+        elif entry[1] is not None:
+            logger.debug(f'Failed to evaluate forward reference {annotation!r} for {func}: {entry[1]}')
+        evaluated, error = entry
+        if error is not None:
+            raise _FailedForwardReference(error.with_traceback(None))
+        return evaluated
+
+    def get_annotations(self, obj, eval_str: bool) -> dict:
+        """Returns annotations of a module or a class along with annotations of its bases, evaluated if eval_str. Should
+        not be modified. Evaluation errors are cached and raised on every call.
+
+        Annotations of every class are taken (and evaluated) once per run, so annotations of a class with a single base
+        are the cached annotations of the base updated with those of the class itself.
+        """
+
+        if not inspect.isclass(obj):
+            return self._get_or_raise(
+                self._annotations[eval_str],
+                obj,
+                lambda module: get_annotations(module, eval_str),
+                (NameError, TypeError),
+            )
+        if eval_str and getattr(obj, '__no_type_check__', None):
+            # Just as typing.get_type_hints does
+            return {}
+        return self._get_merged_annotations(obj, eval_str)
+
+    def _get_merged_annotations(self, cls: type, eval_str: bool) -> dict:
+        def compute(obj):
+            mro = obj.__mro__[1:]
+            if len(obj.__bases__) == 1 and obj.__bases__[0].__mro__ == mro:
+                annotations = dict(self._get_merged_annotations(obj.__bases__[0], eval_str))
+            else:
+                annotations = {}
+                for parent in reversed(mro):
+                    annotations.update(self._get_own_annotations(parent, eval_str))
+            annotations.update(self._get_own_annotations(obj, eval_str))
+            return annotations
+
+        return self._get_or_raise(self._annotations[eval_str], cls, compute, (NameError, TypeError))
+
+    def _get_own_annotations(self, cls: type, eval_str: bool) -> dict:
+        return self._get_or_raise(
+            self._own_annotations[eval_str],
+            cls,
+            lambda obj: get_own_annotations(obj, eval_str),
+            (NameError, TypeError),
+        )
+
+    def get_type_hint_origin_and_args(self, type_hint) -> Tuple[Any, Sequence, bool]:
+        return self._get_or_compute(self._type_hint_components, type_hint, get_type_hint_origin_and_args)
+
+    def are_almost_same(self, left, right, compare: Callable[[Any, Any], bool]) -> bool:
+        """Returns the result of compare(left, right) computed once per pair of objects and comparison function.
+
+        Bound methods (e.g. class methods taken from a class) are created on every access, so they are identified by
+        their functions and compare should not depend on objects methods are bound to.
+        """
+
+        left_target = left.__func__ if isinstance(left, MethodType) else left
+        right_target = right.__func__ if isinstance(right, MethodType) else right
+        # Methods comparing members of different kinds of classes may compare them differently
+        key = (
+            id(left_target),
+            left_target is not left,
+            id(right_target),
+            right_target is not right,
+            getattr(compare, '__func__', compare),
+        )
+        entry = self._almost_same.get(key)
+        if entry is None:
+            entry = self._almost_same[key] = (left_target, right_target, compare(left, right))
+        return entry[2]
+
+    def get_class_attributes(self, cls: type) -> Dict[str, Any]:
+        """Returns attributes of cls as they are stored in `__dict__`s along its MRO. Should not be modified"""
+
+        def compute(obj):
+            attributes = dict(self.get_inherited_attributes(obj))
+            attributes.update(vars(obj))
+            return attributes
+
+        return self._get_or_compute(self._class_attributes, cls, compute)
+
+    def get_inherited_attributes(self, cls: type) -> Dict[str, Any]:
+        """Returns attributes cls inherits from its bases. Should not be modified.
+
+        Classes with a single base inherit exactly the attributes of the base (their MRO is the base MRO preceded by the
+        class itself), so the table of the base is reused. Otherwise `__dict__`s along the MRO are walked.
+        """
+
+        def compute(obj):
+            mro = obj.__mro__[1:]
+            if len(obj.__bases__) == 1 and obj.__bases__[0].__mro__ == mro:
+                return self.get_class_attributes(obj.__bases__[0])
+            return get_mro_attributes(mro)
+
+        return self._get_or_compute(self._inherited_attributes, cls, compute)
+
+    def get_parsed_docstring(self, docstring: str) -> docstring_parser.Docstring:
+        parsed_docstring = self._parsed_docstrings.get(docstring)
+        if parsed_docstring is None:
+            parsed_docstring = self._parsed_docstrings[docstring] = docstring_parser.google.parse(docstring)
+        return parsed_docstring
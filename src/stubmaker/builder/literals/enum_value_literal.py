@@ -2,6 +2,8 @@ from stubmaker.builder.common import Node, BaseRepresentationsTreeBuilder, BaseL
 
 
 class EnumValueLiteral(BaseLiteral):
+    __slots__ = ('enum_class',)
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
         self.enum_class = self.tree.get_literal(
@@ -2,4 +2,4 @@ from stubmaker.builder.common import BaseLiteral
 
 
 class ReferenceLiteral(BaseLiteral):
-    pass
+    __slots__ = ()
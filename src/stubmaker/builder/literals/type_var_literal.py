@@ -6,6 +6,8 @@ from stubmaker.builder.common import BaseLiteral, BaseRepresentationsTreeBuilder
 class TypeVarLiteral(BaseLiteral):
     """Represents a TypeVar"""
 
+    __slots__ = ('origin', 'type_var_name', 'type_var_reference', 'covariant', 'contravariant', 'bound')
+
     def __init__(self, node: Node, tree: BaseRepresentationsTreeBuilder):
         super().__init__(node, tree)
         self.origin = self.tree.get_literal(self.tree.create_node_for_object(self.namespace, None, TypeVar))
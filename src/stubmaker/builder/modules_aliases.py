@@ -0,0 +1,69 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _PrefixTrieNode:
+    def __init__(self):
+        self.children: Dict[str, '_PrefixTrieNode'] = {}
+        # (last segment of prefix, prefix) pairs for prefixes that end in the segment following this node. Sorted by
+        # length descending so the first match is the longest one
+        self.prefixes: List[Tuple[str, str]] = []
+
+
+class ModulesAliasesMapping(Mapping):
+    """Mapping from module name prefixes to their aliases with a fast longest prefix lookup.
+
+    Prefixes are stored in a trie of dotted segments. A prefix matches a module name if the module name starts with the
+    prefix, so prefixes ending in the middle of a segment (e.g. `_asyncio` for `_asyncio_ext`) are matched as well. Once
+    mapped, module names are memoized.
+
+    Parameters:
+        aliases: a dictionary from module name prefixes to aliases the prefixes should be replaced with.
+    """
+
+    def __init__(self, aliases: Mapping):
+        self._aliases = dict(aliases)
+        self._root = _PrefixTrieNode()
+        self._mapped_module_names: Dict[str, str] = {}
+
+        for prefix in self._aliases:
+            *segments, last_segment = prefix.split('.')
+            node = self._root
+            for segment in segments:
+                node = node.children.setdefault(segment, _PrefixTrieNode())
+            node.prefixes.append((last_segment, prefix))
+            node.prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def __getitem__(self, prefix: str) -> str:
+        return self._aliases[prefix]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._aliases)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def get_longest_prefix(self, module_name: str) -> Optional[str]:
+        # Prefixes matched deeper in the trie are always longer than the ones matched closer to the root
+        longest_prefix = None
+        node: Optional[_PrefixTrieNode] = self._root
+        for segment in module_name.split('.'):
+            if node is None:
+                break
+            for last_segment, prefix in node.prefixes:
+                if segment.startswith(last_segment):
+                    longest_prefix = prefix
+                    break
+            node = node.children.get(segment)
+        return longest_prefix
+
+    def map_module_name(self, module_name: str) -> str:
+        mapped_module_name = self._mapped_module_names.get(module_name)
+        if mapped_module_name is None:
+            longest_prefix = self.get_longest_prefix(module_name)
+            if longest_prefix is None:
+                mapped_module_name = module_name
+            else:
+                mapped_module_name = self._aliases[longest_prefix] + module_name[len(longest_prefix) :]
+            self._mapped_module_names[module_name] = mapped_module_name
+        return mapped_module_name
@@ -0,0 +1,79 @@
+import inspect
+import sys
+from types import ModuleType
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class ObjectIndex:
+    """Index from objects to names of modules they are defined in and their qualnames.
+
+    One index is meant to be shared by all modules processed in a run: it is filled with members of every module when
+    the module is imported (see traverse_modules) and so `inspect.getmodule`, which may scan the whole `sys.modules`,
+    is called at most once for each object. Objects are indexed by identity and are kept alive by the index so their
+    ids can't be reused. Objects for which no module is found are remembered until a module is added to (or removed
+    from) the index or `sys.modules`, as their module may be imported later.
+
+    Objects of a module that is imported again (e.g. in watch mode) are dropped once the new module is indexed or the
+    module is removed explicitly, so that the index doesn't keep every version of the module alive.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Any, str, Optional[str]]] = {}
+        # Ids of indexed objects by names of modules they are defined in
+        self._module_object_ids: Dict[str, Set[int]] = {}
+        # Ids of indexed modules by their names
+        self._module_ids: Dict[str, int] = {}
+        # Objects for which no module is found along with their qualnames, valid while sys.modules has the same size
+        self._misses: Dict[int, Tuple[Any, Optional[str]]] = {}
+        self._misses_modules_count = 0
+
+    def add_module(self, module: ModuleType):
+        if self._module_ids.get(module.__name__, id(module)) != id(module):
+            self.remove_module(module.__name__)
+        self._module_ids[module.__name__] = id(module)
+        self._misses.clear()
+        for obj in list(module.__dict__.values()):
+            self.get_module_name_and_qualname(obj)
+
+    def remove_module(self, module_name: str):
+        """Forgets objects defined in a module, e.g. once the module is unloaded to be imported again"""
+
+        self._module_ids.pop(module_name, None)
+        self._misses.clear()
+        for object_id in self._module_object_ids.pop(module_name, ()):
+            del self._entries[object_id]
+
+    def add_object(self, obj, module_name: str, qualname: Optional[str]):
+        """Indexes an object with a known module name and qualname, e.g. an object whose module can't be imported"""
+        self._add_entry(obj, module_name, qualname)
+
+    def _add_entry(self, obj, module_name: str, qualname: Optional[str]):
+        entry = self._entries.get(id(obj))
+        if entry is not None:
+            self._module_object_ids[entry[1]].discard(id(obj))
+        self._entries[id(obj)] = (obj, module_name, qualname)
+        self._module_object_ids.setdefault(module_name, set()).add(id(obj))
+
+    def get_module_name_and_qualname(self, obj) -> Tuple[Optional[str], Optional[str]]:
+        entry = self._entries.get(id(obj))
+        if entry is not None:
+            return entry[1], entry[2]
+
+        if self._misses_modules_count != len(sys.modules):
+            self._misses.clear()
+            self._misses_modules_count = len(sys.modules)
+        miss = self._misses.get(id(obj))
+        if miss is not None:
+            return None, miss[1]
+
+        module = inspect.getmodule(obj)
+        qualname = getattr(obj, '__qualname__', None)
+        if module is None:
+            self._misses[id(obj)] = (obj, qualname)
+            return None, qualname
+
+        self._add_entry(obj, module.__name__, qualname)
+        return module.__name__, qualname
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,7 +4,9 @@ import inspect
 from contextvars import ContextVar
 from enum import Enum
 from types import ModuleType
-from typing import TypeVar, Optional
+from typing import Any, Callable, Mapping, Optional, Sequence, Set, Tuple, TypeVar
+
+import docstring_parser
 
 from stubmaker.builder.common import BaseDefinition, BaseLiteral, BaseRepresentationsTreeBuilder, Node
 from stubmaker.builder.definitions import (
@@ -19,6 +21,9 @@ from stubmaker.builder.definitions import (
     ClassMethodDef,
     EnumDef,
 )
+from stubmaker.builder.introspection_cache import IntrospectionCache
+from stubmaker.builder.modules_aliases import ModulesAliasesMapping
+from stubmaker.builder.object_index import ObjectIndex
 from stubmaker.builder.literals import ReferenceLiteral, TypeHintLiteral, TypeVarLiteral, ValueLiteral, EnumValueLiteral
 from typing_inspect import is_generic_type
 
@@ -28,6 +33,11 @@ class RepresentationsTreeBuilder(BaseRepresentationsTreeBuilder):
         ModuleType: ('types', 'ModuleType'),
         ContextVar: ('contextvars', 'ContextVar'),
     }
+    DEFAULT_MODULES_ALIASES_MAPPING = ModulesAliasesMapping(
+        {
+            '_asyncio': 'asyncio',
+        }
+    )
 
     def __init__(
         self,
@@ -38,6 +48,8 @@ class RepresentationsTreeBuilder(BaseRepresentationsTreeBuilder):
         described_objects=None,
         preserve_forward_references=True,
         always_include_init=False,
+        object_index=None,
+        introspection_cache=None,
     ):
         """Class used to build the tree of objects and definitions representations for one module.
 
@@ -45,21 +57,26 @@ class RepresentationsTreeBuilder(BaseRepresentationsTreeBuilder):
             module_name: name of the current module.
             module: current module object.
             module_root: current module root package. Used in imports.
-            modules_aliases_mapping: a dictionary of modules aliases to use.
+            modules_aliases_mapping: a dictionary of modules aliases to use. May be passed as ModulesAliasesMapping in
+                order to share compiled prefixes and already mapped module names between builders.
             described_objects: a dictionary from python objects to tuples consisting of module and qualname for each
                 object (e.g. ModuleType: ("types", "ModuleType")). Such objects' names and modules will not be deduced
                 based on runtime data and provided names and modules will be used instead.
             preserve_forward_references: if True forward references will not be evaluated in resulting expressions.
             always_include_init: If True __init__ will be present in class even if it was actually defined in its base
                 class and remained unchanged.
+            object_index: an index of objects' modules and qualnames shared between modules processed in one run. A
+                new index is created if not specified.
+            introspection_cache: a cache of signatures and other namespace-independent data shared between modules
+                processed in one run. A new cache is created if not specified.
         """
 
         super().__init__()
 
         if modules_aliases_mapping is None:
-            modules_aliases_mapping = {
-                '_asyncio': 'asyncio',
-            }
+            modules_aliases_mapping = self.DEFAULT_MODULES_ALIASES_MAPPING
+        elif not isinstance(modules_aliases_mapping, ModulesAliasesMapping):
+            modules_aliases_mapping = ModulesAliasesMapping(modules_aliases_mapping)
 
         described_objects = described_objects or self.DEFAULT_DESCRIBED_OBJECTS
         self.object_qualname_mapping = {obj: qualname for obj, (_, qualname) in described_objects.items()}
@@ -70,6 +87,10 @@ class RepresentationsTreeBuilder(BaseRepresentationsTreeBuilder):
         self.modules_aliases_mapping = modules_aliases_mapping
         self.preserve_forward_references = preserve_forward_references
         self.always_include_init = always_include_init
+        self.object_index = ObjectIndex() if object_index is None else object_index
+        self.introspection_cache = IntrospectionCache() if introspection_cache is None else introspection_cache
+        # Modules of all the objects representations were built from (before applying aliases)
+        self.consulted_module_names = set()
 
         self.module_rep = self.get_module_definition(self.create_node_for_object('', '', module))
 
@@ -82,26 +103,59 @@ class RepresentationsTreeBuilder(BaseRepresentationsTreeBuilder):
             qualname = None
 
         if module_name is None:
-            guessed_module = inspect.getmodule(obj)
-            module_name = guessed_module and guessed_module.__name__
+            module_name, indexed_qualname = self.object_index.get_module_name_and_qualname(obj)
+            qualname = qualname or indexed_qualname
+        elif not qualname:
+            qualname = getattr(obj, '__qualname__', None)
+
+        if module_name is not None:
+            self.consulted_module_names.add(module_name)
 
         return Node(
             namespace,
             name,
             obj,
             module_name=self.map_module_name(module_name),
-            qualname=qualname or getattr(obj, '__qualname__', None),
+            qualname=qualname,
         )
 
+    def get_module_dependencies(self) -> Set[str]:
+        """Returns names of modules of module_root package other than the current one that representations were built
+        from. Definitions are built lazily, so all the dependencies are known only once the module is rendered.
+        """
+
+        return {
+            module_name
+            for module_name in self.consulted_module_names
+            if module_name != self.module_name
+            and (module_name == self.module_root or module_name.startswith(self.module_root + '.'))
+        }
+
     def map_module_name(self, module_name: Optional[str]) -> Optional[str]:
         if not module_name:
             return None
+        return self.modules_aliases_mapping.map_module_name(module_name)
+
+    def get_signature(self, func) -> inspect.Signature:
+        return self.introspection_cache.get_signature(func)
+
+    def get_type_hints(self, func, globalns: Optional[dict]) -> dict:
+        return self.introspection_cache.get_type_hints(func, globalns)
+
+    def get_type_hint_origin_and_args(self, type_hint) -> Tuple[Any, Sequence, bool]:
+        return self.introspection_cache.get_type_hint_origin_and_args(type_hint)
+
+    def get_parsed_docstring(self, docstring: str) -> docstring_parser.Docstring:
+        return self.introspection_cache.get_parsed_docstring(docstring)
+
+    def are_almost_same(self, left, right, compare: Callable[[Any, Any], bool]) -> bool:
+        return self.introspection_cache.are_almost_same(left, right, compare)
+
+    def get_inherited_attributes(self, cls: type) -> Mapping[str, Any]:
+        return self.introspection_cache.get_inherited_attributes(cls)
 
-        prefixes = [(len(key), key) for key in self.modules_aliases_mapping if module_name.startswith(key)]
-        if not prefixes:
-            return module_name
-        longest_prefix = max(prefixes)[1]
-        return self.modules_aliases_mapping[longest_prefix] + module_name[len(longest_prefix) :]
+    def get_annotations(self, obj, eval_str: bool) -> dict:
+        return self.introspection_cache.get_annotations(obj, eval_str)
 
     def get_definition(self, node: Node):
         """Resolve a node to its definition"""
@@ -0,0 +1,856 @@
+"""Building modules from their source files without importing them"""
+
+__all__ = [
+    'StaticModuleLoader',
+    'StaticResolutionError',
+]
+
+import abc
+import ast
+import builtins
+import contextlib
+import dataclasses
+import enum
+import functools
+import importlib
+import importlib.util
+import logging
+import operator
+import os
+import sys
+import types
+import typing
+from typing import Any, Callable, Dict, Iterable, List, MutableMapping, Optional, Tuple
+
+from stubmaker.builder.import_ import find_source_path
+from stubmaker.builder.object_index import ObjectIndex
+
+
+class StaticResolutionError(Exception):
+    """Raised when a module can't be built from its source file without executing it"""
+
+
+class _UnresolvedValue:
+    """Value of an expression that can't be evaluated statically. Rendered as `...` in stubs"""
+
+    __slots__ = ()
+    # Unresolved values do not belong to any module
+    __module__ = None  # type: ignore
+
+
+# Standard library decorators applied to synthesized functions and classes as they are
+_DECORATORS = tuple(
+    decorator
+    for decorator in (
+        staticmethod,
+        classmethod,
+        property,
+        abc.abstractmethod,
+        contextlib.contextmanager,
+        functools.total_ordering,
+        getattr(functools, 'cache', None),
+        getattr(functools, 'cached_property', None),
+        enum.unique,
+        dataclasses.dataclass,
+        typing.overload,
+        getattr(typing, 'final', None),
+        getattr(typing, 'runtime_checkable', None),
+    )
+    if decorator is not None
+)
+
+# Standard library decorators taking arguments, e.g. `@dataclass(frozen=True)`
+_DECORATOR_FACTORIES = (dataclasses.dataclass, functools.lru_cache)
+
+# Standard library callables whose results are deterministic and do not depend on the package code
+_CALLABLES = (typing.TypeVar, typing.NewType, enum.auto, dataclasses.field, *_DECORATOR_FACTORIES)
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_,
+    ast.BitXor: operator.xor,
+    ast.BitOr: operator.or_,
+}
+
+_UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Not: operator.not_,
+    ast.Invert: operator.invert,
+}
+
+_COMPARISON_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+
+# Operators are applied to values of these types only (and `|` to types as well) so no package code is executed
+_OPERAND_TYPES = (bool, int, float, complex, str, bytes, tuple, list, type(None))
+
+_STDLIB_MODULE_NAMES = getattr(sys, 'stdlib_module_names', frozenset(sys.builtin_module_names))
+
+
+def _is_one_of(obj, objects: Iterable) -> bool:
+    return any(obj is other for other in objects)
+
+
+def _has_annotations(statements: Iterable[ast.AST]) -> bool:
+    """Checks if a module or a class body sets up `__annotations__`, i.e. if it contains annotated assignments"""
+
+    for statement in statements:
+        if isinstance(statement, ast.AnnAssign):
+            return True
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        # Compound statements, exception handlers and match cases
+        for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+            if _has_annotations(getattr(statement, field, None) or []):
+                return True
+    return False
+
+
+def _is_generator(function_node) -> bool:
+    nodes = list(function_node.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.Yield, ast.YieldFrom)):
+            return True
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            nodes.extend(ast.iter_child_nodes(node))
+    return False
+
+
+# Everything a code object of a function without body depends on except for names and locations: whether the function
+# is async, whether it is a generator, names of positional-only, positional, variadic positional, keyword-only and
+# variadic keyword arguments
+_FunctionShape = Tuple[bool, bool, Tuple[str, ...], Tuple[str, ...], Optional[str], Tuple[str, ...], Optional[str]]
+
+
+def _compile_function_code(shape: _FunctionShape, name: str, filename: str, first_lineno: int) -> types.CodeType:
+    is_async, is_generator, posonlyargs, args, vararg, kwonlyargs, kwarg = shape
+
+    def to_arguments(names):
+        return [ast.arg(arg=name, annotation=None, type_comment=None) for name in names]
+
+    arguments: Dict[str, Any] = dict(
+        args=to_arguments(args),
+        vararg=vararg and to_arguments([vararg])[0],
+        kwonlyargs=to_arguments(kwonlyargs),
+        kw_defaults=[None] * len(kwonlyargs),
+        kwarg=kwarg and to_arguments([kwarg])[0],
+        defaults=[],
+    )
+    if sys.version_info >= (3, 8):
+        arguments['posonlyargs'] = to_arguments(posonlyargs)
+
+    # Generators are kept generators
+    body = ast.Expr(ast.Yield(None)) if is_generator else ast.Pass()
+    function_type = ast.AsyncFunctionDef if is_async else ast.FunctionDef
+    statement = function_type(
+        name=name,
+        args=ast.arguments(**arguments),
+        body=[body],
+        decorator_list=[],
+        returns=None,
+        type_comment=None,
+        lineno=first_lineno,
+        col_offset=0,
+    )
+    code_module = ast.fix_missing_locations(ast.Module(body=[statement], type_ignores=[]))
+
+    namespace: Dict[str, Any] = {}
+    exec(compile(code_module, filename, 'exec'), namespace)
+    return namespace[name].__code__
+
+
+class _Scope:
+    """Namespace statements are executed in: a module namespace or a class body namespace"""
+
+    def __init__(self, namespace: MutableMapping[str, Any], module_namespace: Dict[str, Any], qualname_prefix: str):
+        self.namespace = namespace
+        self.module_namespace = module_namespace
+        self.qualname_prefix = qualname_prefix
+
+    def lookup(self, name: str):
+        for namespace in (self.namespace, self.module_namespace, builtins.__dict__):
+            if name in namespace:
+                return namespace[name]
+        raise StaticResolutionError(f'name {name!r} is not defined')
+
+
+class StaticModuleLoader:
+    """Builds modules of a package from `ast` parses of their source files instead of importing them.
+
+    Module-level and class-level statements are executed by the loader: classes are created with their actual bases and
+    metaclasses, functions get their signatures, annotations, defaults and docstrings but not their bodies (which are
+    never executed), expressions are evaluated if they consist of literals, names, attributes, subscriptions, operators
+    and calls of a few standard library callables (e.g. `typing.TypeVar`). Values that can't be evaluated are replaced
+    with opaque objects rendered as `...` in stubs.
+
+    Names imported from modules outside of the package are resolved to the actual objects if the modules are already
+    imported or belong to the standard library. Otherwise the modules are not imported and their members are replaced
+    with placeholder classes registered in object_index under the imported names.
+
+    A module is imported instead (see override_module_import_path) if it can't be built statically: e.g. it uses
+    a metaclass or a decorator defined in the package, its annotations or bases call functions, or it contains
+    statements such as loops at the module level.
+
+    Parameters:
+        module_root: name of the package whose modules are loaded.
+        sources_path: path to the package sources.
+        object_index: index to register placeholders in. Should be passed to RepresentationsTreeBuilder building
+            representations of loaded modules. A new index is created if not specified.
+    """
+
+    def __init__(self, module_root: str, sources_path: str, object_index: Optional[ObjectIndex] = None):
+        self.module_root = module_root
+        self.sources_path = sources_path
+        self.object_index = ObjectIndex() if object_index is None else object_index
+        self.static_modules: Dict[str, types.ModuleType] = {}
+        self.imported_modules: Dict[str, types.ModuleType] = {}
+        self._building_modules: Dict[str, types.ModuleType] = {}
+        self._placeholder_modules: Dict[str, types.ModuleType] = {}
+        self._placeholders: Dict[Tuple[str, str], type] = {}
+        # Synthesized classes and functions by their ids
+        self._synthesized: Dict[int, Any] = {}
+        self.code_templates: Dict[tuple, types.CodeType] = {}
+
+    def load(self, module_name: str) -> types.ModuleType:
+        """Returns a module built from its source file or an imported module if it can't be built statically"""
+
+        module = self._get_loaded_module(module_name)
+        if module is not None:
+            return module
+
+        # Parent packages are loaded first just as on import
+        parent_name, _, name = module_name.rpartition('.')
+        parent = self.load(parent_name) if parent_name and self.is_package_module(parent_name) else None
+
+        # Parent package may have loaded the module already
+        module = self._get_loaded_module(module_name)
+        if module is None:
+            try:
+                module = self._build_module(module_name)
+            except StaticResolutionError as exc:
+                logging.info(f'Importing module {module_name} as it can not be built statically: {exc}')
+                module = self.imported_modules[module_name] = importlib.import_module(module_name)
+
+        # Imported packages get only imported submodules as their code would call functions without bodies otherwise
+        if parent is not None and (self.is_static_module(parent) or module is sys.modules.get(module_name)):
+            setattr(parent, name, module)
+        return module
+
+    def unload(self, module_name: str):
+        """Forgets a module so that it is loaded again on the next `load`, e.g. once its source file is changed"""
+
+        for modules in (self.static_modules, self.imported_modules):
+            module = modules.pop(module_name, None)
+            if module is not None and sys.modules.get(module_name) is module:
+                del sys.modules[module_name]
+
+    def register_modules(self):
+        """Adds modules built statically to sys.modules unless they were imported in the meantime.
+
+        Should be called after all the modules are loaded: registered modules can't be used by the package code as
+        their functions have no bodies.
+        """
+
+        for module_name, module in self.static_modules.items():
+            sys.modules.setdefault(module_name, module)
+
+    def is_package_module(self, module_name: str) -> bool:
+        return module_name == self.module_root or module_name.startswith(self.module_root + '.')
+
+    def _get_loaded_module(self, module_name: str) -> Optional[types.ModuleType]:
+        for modules in (self._building_modules, self.static_modules, self.imported_modules, sys.modules):
+            module = modules.get(module_name)
+            if module is not None:
+                return module
+        return None
+
+    def _build_module(self, module_name: str) -> types.ModuleType:
+        source_path = find_source_path(self.module_root, self.sources_path, module_name)
+        if source_path is None:
+            raise StaticResolutionError('source file is not found')
+
+        with open(source_path, 'rb') as source_flo:
+            source = source_flo.read()
+        try:
+            tree = ast.parse(source, source_path)
+        except SyntaxError as exc:
+            raise StaticResolutionError(f'failed to parse source file: {exc}') from exc
+
+        is_package = os.path.basename(source_path) == '__init__.py'
+        module = types.ModuleType(module_name, ast.get_docstring(tree, clean=False))
+        module.__file__ = source_path
+        module.__spec__ = importlib.util.spec_from_file_location(
+            module_name,
+            source_path,
+            submodule_search_locations=[os.path.dirname(source_path)] if is_package else None,
+        )
+        module.__loader__ = module.__spec__.loader  # type: ignore
+        module.__package__ = module_name if is_package else module_name.rpartition('.')[0]
+        if is_package:
+            module.__path__ = [os.path.dirname(source_path)]  # type: ignore
+
+        self._building_modules[module_name] = module
+        try:
+            # Looking for generator functions only if there may be any
+            _ModuleBuilder(self, module, tree, may_contain_generators=b'yield' in source).build()
+        finally:
+            del self._building_modules[module_name]
+        self.static_modules[module_name] = module
+        return module
+
+    def import_module(self, module_name: str) -> types.ModuleType:
+        """Resolves a module imported by the package code"""
+
+        if self.is_package_module(module_name):
+            return self.load(module_name)
+        module = sys.modules.get(module_name)
+        if module is not None:
+            return module
+        if module_name.partition('.')[0] in _STDLIB_MODULE_NAMES:
+            with contextlib.suppress(ImportError):
+                return importlib.import_module(module_name)
+        return self.get_placeholder_module(module_name)
+
+    def import_module_with_parents(self, module_name: str) -> List[types.ModuleType]:
+        """Resolves a module and its parent packages as `import a.b.c` does. Returns modules from the outermost one"""
+
+        names = module_name.split('.')
+        modules: List[types.ModuleType] = []
+        for index, name in enumerate(names):
+            module = self.import_module('.'.join(names[: index + 1]))
+            if modules and self.is_placeholder_module(modules[-1]):
+                setattr(modules[-1], name, module)
+            modules.append(module)
+        return modules
+
+    def get_placeholder_module(self, module_name: str) -> types.ModuleType:
+        module = self._placeholder_modules.get(module_name)
+        if module is None:
+            module = self._placeholder_modules[module_name] = types.ModuleType(module_name)
+        return module
+
+    def is_placeholder_module(self, obj) -> bool:
+        return isinstance(obj, types.ModuleType) and self._placeholder_modules.get(obj.__name__) is obj
+
+    def get_placeholder(self, module_name: str, qualname: str) -> type:
+        placeholder = self._placeholders.get((module_name, qualname))
+        if placeholder is None:
+            namespace = {'__module__': module_name, '__qualname__': qualname, '__doc__': None}
+            placeholder = type(qualname.rpartition('.')[2], (), namespace)
+            self._placeholders[(module_name, qualname)] = placeholder
+            self.object_index.add_object(placeholder, module_name, qualname)
+        return placeholder
+
+    def is_placeholder(self, obj) -> bool:
+        if not isinstance(obj, type):
+            return False
+        return self._placeholders.get((obj.__module__, obj.__qualname__)) is obj
+
+    def is_static_module(self, obj) -> bool:
+        if not isinstance(obj, types.ModuleType):
+            return False
+        return _is_one_of(obj, (self.static_modules.get(obj.__name__), self._building_modules.get(obj.__name__)))
+
+    def add_synthesized(self, obj):
+        self._synthesized[id(obj)] = obj
+
+    def is_synthesized(self, obj) -> bool:
+        return self._synthesized.get(id(obj)) is obj
+
+
+class _ModuleBuilder:
+    """Executes module-level and class-level statements of a module source"""
+
+    def __init__(self, loader: StaticModuleLoader, module: types.ModuleType, tree: ast.Module, may_contain_generators):
+        self.loader = loader
+        self.module = module
+        self.tree = tree
+        self.may_contain_generators = may_contain_generators
+        # Set by `from __future__ import annotations`
+        self.postponed_annotations = False
+
+    def build(self):
+        namespace = self.module.__dict__
+        if _has_annotations(self.tree.body):
+            namespace['__annotations__'] = {}
+        self.execute(self.tree.body, _Scope(namespace, namespace, ''))
+
+    # Statements
+
+    def execute(self, statements: Iterable[ast.stmt], scope: _Scope):
+        for statement in statements:
+            execute_statement = getattr(self, f'execute_{type(statement).__name__.lower()}', None)
+            if execute_statement is None:
+                raise StaticResolutionError(
+                    f'{type(statement).__name__} statement at line {statement.lineno} can not be executed statically'
+                )
+            execute_statement(statement, scope)
+
+    def execute_import(self, statement: ast.Import, scope: _Scope):
+        for alias in statement.names:
+            modules = self.loader.import_module_with_parents(alias.name)
+            if alias.asname:
+                scope.namespace[alias.asname] = modules[-1]
+            else:
+                scope.namespace[alias.name.partition('.')[0]] = modules[0]
+
+    def execute_importfrom(self, statement: ast.ImportFrom, scope: _Scope):
+        module_name = importlib.util.resolve_name(
+            '.' * statement.level + (statement.module or ''), self.module.__package__
+        )
+        if module_name == '__future__' and any(alias.name == 'annotations' for alias in statement.names):
+            self.postponed_annotations = True
+
+        module = self.loader.import_module_with_parents(module_name)[-1]
+        for alias in statement.names:
+            if alias.name == '*':
+                for name in self._get_star_import_names(module):
+                    scope.namespace[name] = self._import_name(module, name)
+            else:
+                scope.namespace[alias.asname or alias.name] = self._import_name(module, alias.name)
+
+    def execute_classdef(self, statement: ast.ClassDef, scope: _Scope):
+        scope.namespace[statement.name] = self._build_class(statement, scope)
+
+    def execute_functiondef(self, statement: ast.FunctionDef, scope: _Scope):
+        scope.namespace[statement.name] = self._build_function(statement, scope)
+
+    execute_asyncfunctiondef = execute_functiondef
+
+    def execute_assign(self, statement: ast.Assign, scope: _Scope):
+        strict = any(isinstance(target, ast.Name) and target.id == '__all__' for target in statement.targets)
+        value = self.evaluate(statement.value, scope) if strict else self.evaluate_value(statement.value, scope)
+        for target in statement.targets:
+            self._assign(target, value, scope)
+
+    def execute_annassign(self, statement: ast.AnnAssign, scope: _Scope):
+        if not isinstance(statement.target, ast.Name):
+            if statement.value is not None:
+                self._assign(statement.target, self.evaluate_value(statement.value, scope), scope)
+            return
+
+        if statement.simple:
+            scope.namespace['__annotations__'][statement.target.id] = self.evaluate_annotation(
+                statement.annotation, scope
+            )
+        if statement.value is not None:
+            if statement.target.id == '__all__':
+                value = self.evaluate(statement.value, scope)
+            else:
+                value = self.evaluate_value(statement.value, scope)
+            self._assign(statement.target, value, scope)
+
+    def execute_augassign(self, statement: ast.AugAssign, scope: _Scope):
+        if not isinstance(statement.target, ast.Name):
+            return
+
+        try:
+            value = self._apply_binary_operator(
+                statement.op, scope.lookup(statement.target.id), self.evaluate(statement.value, scope)
+            )
+        except StaticResolutionError:
+            if statement.target.id == '__all__':
+                raise
+            value = _UnresolvedValue()
+        scope.namespace[statement.target.id] = value
+
+    def execute_expr(self, statement: ast.Expr, scope: _Scope):
+        # Expressions are evaluated for their side effects which are not reproduced except for modifications of
+        # __all__ such as `__all__.extend(submodule.__all__)`
+        call = statement.value
+        if (
+            isinstance(call, ast.Call)
+            and isinstance(call.func, ast.Attribute)
+            and isinstance(call.func.value, ast.Name)
+            and call.func.value.id == '__all__'
+            and call.func.attr in ('append', 'extend', 'insert', 'remove')
+        ):
+            names = scope.lookup('__all__')
+            if not isinstance(names, list) or call.keywords:
+                raise StaticResolutionError(f'__all__ modification at line {statement.lineno} is not supported')
+            getattr(names, call.func.attr)(*(self.evaluate(arg, scope) for arg in call.args))
+
+    def execute_if(self, statement: ast.If, scope: _Scope):
+        if self.evaluate(statement.test, scope):
+            self.execute(statement.body, scope)
+        else:
+            self.execute(statement.orelse, scope)
+
+    def execute_try(self, statement: ast.Try, scope: _Scope):
+        # Exceptions are not expected to be raised, so handlers are not executed
+        self.execute(statement.body, scope)
+        self.execute(statement.orelse, scope)
+        self.execute(statement.finalbody, scope)
+
+    execute_trystar = execute_try
+
+    def execute_delete(self, statement: ast.Delete, scope: _Scope):
+        for target in statement.targets:
+            if isinstance(target, ast.Name):
+                scope.namespace.pop(target.id, None)
+
+    def execute_pass(self, statement: ast.stmt, scope: _Scope):
+        pass
+
+    execute_assert = execute_global = execute_nonlocal = execute_pass
+
+    def _assign(self, target: ast.expr, value, scope: _Scope):
+        if isinstance(target, ast.Name):
+            scope.namespace[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            if (
+                isinstance(value, (tuple, list))
+                and len(value) == len(target.elts)
+                and not any(isinstance(element, ast.Starred) for element in target.elts)
+            ):
+                for element, element_value in zip(target.elts, value):
+                    self._assign(element, element_value, scope)
+            else:
+                for element in target.elts:
+                    self._assign(
+                        element.value if isinstance(element, ast.Starred) else element, _UnresolvedValue(), scope
+                    )
+        elif isinstance(target, ast.Attribute):
+            # Only attributes of synthesized objects are set, e.g. `SomeClass.__doc__ = DOCSTRING`
+            try:
+                obj = self.evaluate(target.value, scope)
+            except StaticResolutionError:
+                return
+            if self.loader.is_synthesized(obj):
+                setattr(obj, target.attr, value)
+
+    def _get_star_import_names(self, module: types.ModuleType) -> List[str]:
+        if self.loader.is_placeholder_module(module):
+            raise StaticResolutionError(f'star import from module {module.__name__} which is not imported')
+        names = module.__dict__.get('__all__')
+        if names is None:
+            return [name for name in module.__dict__ if not name.startswith('_')]
+        return list(names)
+
+    def _import_name(self, module: types.ModuleType, name: str):
+        if self.loader.is_placeholder_module(module):
+            return module.__dict__.get(name) or self.loader.get_placeholder(module.__name__, name)
+
+        if name in module.__dict__:
+            return module.__dict__[name]
+        if not self.loader.is_static_module(module) and hasattr(module, name):
+            return getattr(module, name)
+
+        # Submodule that is not imported yet
+        submodule_name = f'{module.__name__}.{name}'
+        if self.loader.is_package_module(submodule_name) or submodule_name in sys.modules:
+            return self.loader.import_module(submodule_name)
+        raise StaticResolutionError(f'can not import name {name!r} from {module.__name__}')
+
+    # Definitions
+
+    def _build_class(self, statement: ast.ClassDef, scope: _Scope) -> type:
+        qualname = scope.qualname_prefix + statement.name
+        bases = tuple(self.evaluate(base, scope) for base in statement.bases)
+        if any(keyword.arg is None for keyword in statement.keywords):
+            raise StaticResolutionError(f'unpacked keywords of class {qualname} are not supported')
+        keywords = {
+            keyword.arg: self.evaluate(keyword.value, scope)
+            for keyword in statement.keywords
+            if keyword.arg is not None
+        }
+
+        # Metaclasses defined in the package would run with methods without bodies
+        metaclasses = [keywords['metaclass']] if 'metaclass' in keywords else []
+        metaclasses.extend(type(base) for base in types.resolve_bases(bases))
+        for metaclass in metaclasses:
+            for cls in getattr(metaclass, '__mro__', ()):
+                if self.loader.is_synthesized(cls) and any(name.startswith('__') for name in vars(cls)):
+                    raise StaticResolutionError(
+                        f'metaclass {cls.__qualname__} of class {qualname} is defined in package'
+                    )
+
+        docstring = ast.get_docstring(statement, clean=False)
+
+        def exec_body(namespace):
+            namespace['__module__'] = self.module.__name__
+            namespace['__qualname__'] = qualname
+            if docstring is not None:
+                namespace['__doc__'] = docstring
+            if _has_annotations(statement.body):
+                namespace['__annotations__'] = {}
+            self.execute(statement.body, _Scope(namespace, self.module.__dict__, qualname + '.'))
+
+        try:
+            cls = types.new_class(statement.name, bases, keywords, exec_body)
+        except StaticResolutionError:
+            raise
+        except Exception as exc:
+            raise StaticResolutionError(f'failed to create class {qualname}: {exc!r}') from exc
+
+        self.loader.add_synthesized(cls)
+        return self._apply_decorators(cls, statement.decorator_list, scope)
+
+    def _build_function(self, statement, scope: _Scope):
+        qualname = scope.qualname_prefix + statement.name
+        arguments = statement.args
+        positional_arguments = [*getattr(arguments, 'posonlyargs', []), *arguments.args]
+
+        defaults = tuple(self.evaluate_value(default, scope) for default in arguments.defaults)
+        kwdefaults = {
+            argument.arg: self.evaluate_value(default, scope)
+            for argument, default in zip(arguments.kwonlyargs, arguments.kw_defaults)
+            if default is not None
+        }
+        annotations = {}
+        for argument in [*positional_arguments, arguments.vararg, *arguments.kwonlyargs, arguments.kwarg]:
+            if argument is not None and argument.annotation is not None:
+                annotations[argument.arg] = self.evaluate_annotation(argument.annotation, scope)
+        if statement.returns is not None:
+            annotations['return'] = self.evaluate_annotation(statement.returns, scope)
+
+        function = types.FunctionType(
+            self._get_function_code(statement, qualname), self.module.__dict__, statement.name
+        )
+        function.__qualname__ = qualname
+        function.__doc__ = ast.get_docstring(statement, clean=False)
+        function.__defaults__ = defaults or None
+        function.__kwdefaults__ = kwdefaults or None
+        function.__annotations__ = annotations
+
+        self.loader.add_synthesized(function)
+        return self._apply_decorators(function, statement.decorator_list, scope)
+
+    def _get_function_code(self, statement, qualname: str) -> types.CodeType:
+        """Returns code of a function with the same arguments as the defined one but without body"""
+
+        arguments = statement.args
+        is_async = type(statement) is ast.AsyncFunctionDef
+        is_generator = self.may_contain_generators and _is_generator(statement)
+        posonlyargs = tuple(argument.arg for argument in getattr(arguments, 'posonlyargs', []))
+        args = tuple(argument.arg for argument in arguments.args)
+        vararg = arguments.vararg and arguments.vararg.arg
+        kwonlyargs = tuple(argument.arg for argument in arguments.kwonlyargs)
+        kwarg = arguments.kwarg and arguments.kwarg.arg
+        shape: _FunctionShape = (is_async, is_generator, posonlyargs, args, vararg, kwonlyargs, kwarg)
+
+        # Pointing the code to the definition in the source file (including decorators as the compiler does)
+        first_lineno = statement.decorator_list[0].lineno if statement.decorator_list else statement.lineno
+        filename = self.module.__file__ or '<unknown>'
+        if not hasattr(types.CodeType, 'replace'):
+            return _compile_function_code(shape, statement.name, filename, first_lineno)
+
+        # Codes of functions without bodies differ only in names and locations if their arguments are of the same kinds
+        template_key = (is_async, is_generator, len(posonlyargs), len(args), bool(vararg), len(kwonlyargs), bool(kwarg))
+        code = self.loader.code_templates.get(template_key)
+        if code is None:
+            code = self.loader.code_templates[template_key] = _compile_function_code(shape, statement.name, filename, 1)
+        replacements: Dict[str, Any] = dict(
+            co_name=statement.name,
+            co_filename=filename,
+            co_firstlineno=first_lineno,
+            # Arguments come first in local variables with keyword-only ones before variadic ones
+            co_varnames=(*posonlyargs, *args, *kwonlyargs, *filter(None, (vararg, kwarg))),
+        )
+        if sys.version_info >= (3, 11):
+            replacements['co_qualname'] = qualname
+        return code.replace(**replacements)
+
+    def _apply_decorators(self, obj, decorators: List[ast.expr], scope: _Scope):
+        for decorator_node in reversed(decorators):
+            decorator = self.evaluate(decorator_node, scope)
+            is_allowed = (
+                _is_one_of(decorator, _DECORATORS)
+                or isinstance(decorator_node, ast.Call)
+                and _is_one_of(self.evaluate(decorator_node.func, scope), _DECORATOR_FACTORIES)
+                # Setters, getters and deleters of properties
+                or isinstance(getattr(decorator, '__self__', None), property)
+            )
+            if not is_allowed:
+                raise StaticResolutionError(
+                    f'decorator at line {decorator_node.lineno} is not a known standard library decorator'
+                )
+
+            try:
+                with self._registered_module():
+                    obj = decorator(obj)
+            except Exception as exc:
+                raise StaticResolutionError(
+                    f'failed to apply decorator at line {decorator_node.lineno}: {exc!r}'
+                ) from exc
+        return obj
+
+    @contextlib.contextmanager
+    def _registered_module(self):
+        """Registers the module in sys.modules while it is built as e.g. dataclass looks up module globals there"""
+
+        module_name = self.module.__name__
+        if module_name in sys.modules:
+            yield
+            return
+
+        sys.modules[module_name] = self.module
+        try:
+            yield
+        finally:
+            del sys.modules[module_name]
+
+    # Expressions
+
+    def evaluate_value(self, node: ast.expr, scope: _Scope):
+        """Evaluates an expression or returns an opaque value if the expression can't be evaluated statically"""
+
+        try:
+            return self.evaluate(node, scope)
+        except StaticResolutionError:
+            return _UnresolvedValue()
+
+    def evaluate_annotation(self, node: ast.expr, scope: _Scope):
+        if self.postponed_annotations:
+            if not hasattr(ast, 'unparse'):
+                raise StaticResolutionError('postponed evaluation of annotations requires python 3.9+')
+            return ast.unparse(node)
+        return self.evaluate(node, scope)
+
+    def evaluate(self, node: ast.expr, scope: _Scope):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if sys.version_info < (3, 8) and isinstance(
+            node, (ast.Num, ast.Str, ast.Bytes, ast.NameConstant, ast.Ellipsis)
+        ):
+            return ast.literal_eval(node)
+
+        if isinstance(node, ast.Name):
+            value = scope.lookup(node.id)
+        elif isinstance(node, ast.Attribute):
+            value = self._get_attribute(self.evaluate(node.value, scope), node.attr)
+        elif isinstance(node, ast.Subscript):
+            value = self._get_item(node, scope)
+        elif isinstance(node, (ast.Tuple, ast.List)):
+            elements = [self.evaluate(element, scope) for element in node.elts]
+            value = tuple(elements) if isinstance(node, ast.Tuple) else elements
+        elif isinstance(node, ast.BinOp):
+            value = self._apply_binary_operator(
+                node.op, self.evaluate(node.left, scope), self.evaluate(node.right, scope)
+            )
+        elif isinstance(node, ast.UnaryOp):
+            operand = self.evaluate(node.operand, scope)
+            self._check_operands(operand)
+            value = self._apply(_UNARY_OPERATORS[type(node.op)], operand)
+        elif isinstance(node, ast.Compare):
+            value = self._compare(node, scope)
+        elif isinstance(node, ast.BoolOp):
+            value = self._apply_boolean_operator(node, scope)
+        elif isinstance(node, ast.Call):
+            value = self._call(node, scope)
+        else:
+            raise StaticResolutionError(
+                f'{type(node).__name__} expression at line {node.lineno} can not be evaluated statically'
+            )
+
+        if isinstance(value, _UnresolvedValue):
+            raise StaticResolutionError(f'value of expression at line {node.lineno} is unknown')
+        return value
+
+    def _get_attribute(self, obj, name: str):
+        if self.loader.is_placeholder_module(obj):
+            return self._import_name(obj, name)
+        if self.loader.is_placeholder(obj):
+            return self.loader.get_placeholder(obj.__module__, f'{obj.__qualname__}.{name}')
+        # Module's __getattr__ of a synthesized module has no body
+        if self.loader.is_static_module(obj):
+            return self._import_name(obj, name)
+
+        try:
+            return getattr(obj, name)
+        except Exception as exc:
+            raise StaticResolutionError(f'failed to get attribute {name!r}: {exc!r}') from exc
+
+    def _get_item(self, node: ast.Subscript, scope: _Scope):
+        container = self.evaluate(node.value, scope)
+        index_node = node.slice
+        if sys.version_info < (3, 9) and isinstance(index_node, ast.Index):
+            index_node = index_node.value  # type: ignore
+        index = self.evaluate(index_node, scope)
+
+        if self.loader.is_placeholder(container) or self.loader.is_placeholder_module(container):
+            raise StaticResolutionError(f'subscription of {container.__qualname__} which is not imported')
+        for cls in getattr(container, '__mro__', ()):
+            if self.loader.is_synthesized(cls) and '__class_getitem__' in vars(cls):
+                raise StaticResolutionError(f'{cls.__qualname__}.__class_getitem__ is defined in package')
+        return self._apply(operator.getitem, container, index)
+
+    def _check_operands(self, *operands):
+        for operand in operands:
+            if not isinstance(operand, _OPERAND_TYPES):
+                raise StaticResolutionError(f'operators are not applied to {type(operand).__qualname__} statically')
+
+    def _apply_binary_operator(self, operator_node: ast.operator, left, right):
+        # `|` constructs unions of types as well
+        if not isinstance(operator_node, ast.BitOr):
+            self._check_operands(left, right)
+        return self._apply(_BINARY_OPERATORS[type(operator_node)], left, right)
+
+    def _compare(self, node: ast.Compare, scope: _Scope) -> bool:
+        left = self.evaluate(node.left, scope)
+        for operator_node, comparator in zip(node.ops, node.comparators):
+            right = self.evaluate(comparator, scope)
+            if not isinstance(operator_node, (ast.Is, ast.IsNot)):
+                self._check_operands(left, right)
+            if not self._apply(_COMPARISON_OPERATORS[type(operator_node)], left, right):
+                return False
+            left = right
+        return True
+
+    def _apply_boolean_operator(self, node: ast.BoolOp, scope: _Scope):
+        for value_node in node.values:
+            value = self.evaluate(value_node, scope)
+            if isinstance(node.op, ast.And) != bool(value):
+                return value
+        return value
+
+    def _call(self, node: ast.Call, scope: _Scope):
+        function = self.evaluate(node.func, scope)
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or any(kw.arg is None for kw in node.keywords):
+            raise StaticResolutionError(f'unpacked arguments at line {node.lineno} are not supported')
+        args = [self.evaluate(arg, scope) for arg in node.args]
+        kwargs = {
+            keyword.arg: self.evaluate(keyword.value, scope) for keyword in node.keywords if keyword.arg is not None
+        }
+
+        if isinstance(function, type) and issubclass(function, enum.Enum):
+            # Functional API defines enums in the caller's module
+            if not function.__members__:
+                kwargs.setdefault('module', self.module.__name__)
+            return self._apply(function, *args, **kwargs)
+
+        if not _is_one_of(function, _CALLABLES):
+            raise StaticResolutionError(f'call at line {node.lineno} can not be evaluated statically')
+        result = self._apply(function, *args, **kwargs)
+        # TypeVar and NewType take their module from the caller's frame
+        if isinstance(result, typing.TypeVar) or function is typing.NewType:
+            with contextlib.suppress(AttributeError, TypeError):
+                result.__module__ = self.module.__name__
+        return result
+
+    @staticmethod
+    def _apply(function: Callable, *args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except Exception as exc:
+            raise StaticResolutionError(f'{function!r} failed: {exc!r}') from exc
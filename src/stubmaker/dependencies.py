@@ -0,0 +1,53 @@
+__all__ = [
+    'DependencyGraph',
+]
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+
+
+class DependencyGraph:
+    """Graph from modules to modules of the same package their stubs depend on.
+
+    A stub depends on a module if any representation of the stub was built from an object defined in the module:
+    e.g. a name reexported from the module, a base class or a type used in annotations.
+
+    Parameters:
+        dependencies: a dictionary from module name to names of modules its stub depends on.
+    """
+
+    def __init__(self, dependencies: Optional[Dict[str, Iterable[str]]] = None):
+        self._dependencies: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        for module_name, module_dependencies in (dependencies or {}).items():
+            self.set_dependencies(module_name, module_dependencies)
+
+    def set_dependencies(self, module_name: str, dependencies: Iterable[str]):
+        self.remove(module_name)
+        self._dependencies[module_name] = set(dependencies)
+        for dependency in self._dependencies[module_name]:
+            self._dependents.setdefault(dependency, set()).add(module_name)
+
+    def remove(self, module_name: str):
+        for dependency in self._dependencies.pop(module_name, ()):
+            self._dependents[dependency].discard(module_name)
+
+    def get_dependencies(self, module_name: str) -> Set[str]:
+        return set(self._dependencies.get(module_name, ()))
+
+    def get_dependents(self, module_name: str) -> Set[str]:
+        return set(self._dependents.get(module_name, ()))
+
+    def get_reverse_closure(self, module_names: Iterable[str]) -> Set[str]:
+        """Returns module_names along with all the modules depending on them directly or transitively"""
+
+        closure = set(module_names)
+        queue: Deque[str] = deque(closure)
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in closure:
+                    closure.add(dependent)
+                    queue.append(dependent)
+        return closure
+
+    def to_json(self) -> Dict[str, list]:
+        return {module_name: sorted(dependencies) for module_name, dependencies in sorted(self._dependencies.items())}
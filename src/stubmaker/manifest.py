@@ -0,0 +1,132 @@
+__all__ = [
+    'MANIFEST_FILE_NAME',
+    'StubsManifest',
+    'get_common_inputs',
+    'get_file_hash',
+    'get_module_inputs',
+    'get_stubmaker_version',
+]
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from stubmaker.dependencies import DependencyGraph
+
+MANIFEST_FILE_NAME = '.stubmaker-manifest.json'
+MANIFEST_FORMAT_VERSION = 2
+
+
+def get_file_hash(path: Optional[str]) -> Optional[str]:
+    if path is None:
+        return None
+    with open(path, 'rb') as flo:
+        return hashlib.sha256(flo.read()).hexdigest()
+
+
+def get_stubmaker_version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # Python 3.7
+        return 'unknown'
+
+    try:
+        return version('stubmaker')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+class StubsManifest:
+    """Record of inputs used to generate every stub in the output directory.
+
+    Manifest is stored in the output directory and allows to skip modules whose inputs did not change since the previous
+    run. Inputs of a module are the hash of its source file, hashes of described objects and modules aliases files and
+    versions of stubmaker and python interpreter. Modules of the package that stubs depend on are recorded as well, so
+    that stubs depending on changed modules are regenerated too (see get_dependency_graph).
+
+    Parameters:
+        output_dir: directory containing generated stubs and the manifest file.
+        modules: a dictionary from module name to the record of its stub path (relative to output_dir), inputs and
+            dependencies.
+    """
+
+    def __init__(self, output_dir: str, modules: Optional[Dict[str, dict]] = None):
+        self.output_dir = output_dir
+        self.modules = modules or {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_FILE_NAME)
+
+    @classmethod
+    def load(cls, output_dir: str) -> 'StubsManifest':
+        """Loads manifest from output_dir. Missing or unreadable manifest results in an empty one"""
+
+        manifest = cls(output_dir)
+        try:
+            with open(manifest.path) as flo:
+                data = json.load(flo)
+        except FileNotFoundError:
+            return manifest
+        except ValueError:
+            logging.warning(f'Ignoring malformed stubs manifest {manifest.path}')
+            return manifest
+
+        if data.get('format_version') == MANIFEST_FORMAT_VERSION:
+            manifest.modules = data['modules']
+        return manifest
+
+    def save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as flo:
+            json.dump(
+                {'format_version': MANIFEST_FORMAT_VERSION, 'modules': self.modules}, flo, indent=2, sort_keys=True
+            )
+        os.replace(tmp_path, self.path)
+
+    def is_up_to_date(self, module_name: str, dst_path: str, inputs: dict) -> bool:
+        record = self.modules.get(module_name)
+        return (
+            record is not None
+            and record['inputs'] == inputs
+            and os.path.join(self.output_dir, record['stub']) == dst_path
+            and os.path.exists(dst_path)
+        )
+
+    def update(self, module_name: str, dst_path: str, inputs: dict, dependencies: Iterable[str] = ()):
+        self.modules[module_name] = {
+            'stub': os.path.relpath(dst_path, self.output_dir),
+            'inputs': inputs,
+            'dependencies': sorted(dependencies),
+        }
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        return DependencyGraph({module_name: record['dependencies'] for module_name, record in self.modules.items()})
+
+    def remove_stale(self, module_names: Iterable[str]) -> List[str]:
+        """Deletes stubs of modules that are not present in module_names anymore and returns their paths"""
+
+        module_names = set(module_names)
+        removed = []
+        for module_name in sorted(set(self.modules) - module_names):
+            dst_path = os.path.join(self.output_dir, self.modules.pop(module_name)['stub'])
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+                removed.append(dst_path)
+        return removed
+
+
+def get_module_inputs(source_path: str, common_inputs: dict) -> dict:
+    return dict(common_inputs, source=get_file_hash(source_path))
+
+
+def get_common_inputs(described_objects_path: Optional[str], modules_aliases_path: Optional[str]) -> dict:
+    return {
+        'described_objects': get_file_hash(described_objects_path),
+        'modules_aliases': get_file_hash(modules_aliases_path),
+        'stubmaker': get_stubmaker_version(),
+        'python': sys.version,
+    }
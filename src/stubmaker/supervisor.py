@@ -0,0 +1,130 @@
+__all__ = [
+    'ModuleBudget',
+    'get_rss',
+    'run_supervised',
+]
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+_Task = TypeVar('_Task')
+_Result = TypeVar('_Result')
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def get_rss(pid: int) -> Optional[int]:
+    """Returns resident set size of a process in bytes or None if it can't be measured on this platform"""
+    try:
+        with open(f'/proc/{pid}/statm') as statm_flo:
+            return int(statm_flo.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ModuleBudget:
+    """Limits of wall time and memory that importing a module and generating its stub may take.
+
+    Parameters:
+        timeout: wall time limit in seconds.
+        memory_limit: limit in bytes of the resident set size growth of a worker process since it was forked.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, memory_limit: Optional[int] = None):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+
+    @property
+    def is_set(self) -> bool:
+        return self.timeout is not None or self.memory_limit is not None
+
+    def check(self, elapsed: float, memory: Optional[int]) -> Optional[str]:
+        """Returns the description of the exceeded limit if any"""
+        if self.timeout is not None and elapsed > self.timeout:
+            return f'exceeded time budget of {self.timeout:g}s'
+        if self.memory_limit is not None and memory is not None and memory > self.memory_limit:
+            return f'exceeded memory budget of {self.memory_limit / 2 ** 20:g}MB'
+        return None
+
+
+def _run_target(target, task, connection):
+    connection.send(target(task))
+    connection.close()
+
+
+def run_supervised(
+    tasks: Iterable[_Task],
+    target: Callable[[_Task], _Result],
+    budget: ModuleBudget,
+    jobs: int = 1,
+    poll_interval: float = 0.05,
+) -> Iterator[Tuple[_Task, Optional[_Result], Optional[str]]]:
+    """Calls target for every task in a forked worker process of its own, killing workers exceeding the budget.
+
+    Workers are forked, so they share everything imported before and only results of target are pickled. At most `jobs`
+    workers run at once. Tasks are yielded in their order along with the result of target and None if the task is
+    completed or None and the description of the exceeded limit if its worker was killed. Raises RuntimeError if a
+    worker fails.
+    """
+
+    tasks = list(tasks)
+    context = multiprocessing.get_context('fork')
+    # Workers by task index along with connections to receive results, their start time and the resident set size they
+    # were forked with
+    running: Dict[int, Tuple[multiprocessing.process.BaseProcess, Connection, float, Optional[int]]] = {}
+    results: Dict[int, _Result] = {}
+    outcomes: Dict[int, Tuple[Optional[_Result], Optional[str]]] = {}
+    next_to_start = 0
+    next_to_yield = 0
+
+    try:
+        while next_to_yield < len(tasks):
+            while next_to_start < len(tasks) and len(running) < jobs:
+                base_memory = get_rss(os.getpid()) if budget.memory_limit is not None else None
+                receiver, sender = context.Pipe(duplex=False)
+                worker = context.Process(target=_run_target, args=(target, tasks[next_to_start], sender))
+                worker.start()
+                sender.close()
+                running[next_to_start] = (worker, receiver, time.monotonic(), base_memory)
+                next_to_start += 1
+
+            # Waking up as soon as any worker sends its result or exits
+            wait(
+                [process.sentinel for process, _, _, _ in running.values()]
+                + [receiver for _, receiver, _, _ in running.values()],
+                timeout=poll_interval,
+            )
+
+            for index, (process, receiver, started_at, base_memory) in list(running.items()):
+                # Receiving results as soon as they are sent so that workers are not blocked on sending large results
+                if index not in results and receiver.poll():
+                    results[index] = receiver.recv()
+                if process.exitcode is not None:
+                    if index not in results and receiver.poll():
+                        results[index] = receiver.recv()
+                    if process.exitcode != 0 or index not in results:
+                        raise RuntimeError(f'Worker processing {tasks[index]!r} exited with code {process.exitcode}')
+                    outcomes[index] = (results.pop(index), None)
+                else:
+                    memory = get_rss(process.pid) if base_memory is not None else None  # type: ignore
+                    memory_growth = None if memory is None or base_memory is None else memory - base_memory
+                    failure = budget.check(time.monotonic() - started_at, memory_growth)
+                    if failure is None:
+                        continue
+                    process.kill()
+                    results.pop(index, None)
+                    outcomes[index] = (None, failure)
+                process.join()
+                receiver.close()
+                del running[index]
+
+            while next_to_yield in outcomes:
+                yield (tasks[next_to_yield], *outcomes.pop(next_to_yield))
+                next_to_yield += 1
+    finally:
+        for process, receiver, _, _ in running.values():
+            process.kill()
+            process.join()
+            receiver.close()
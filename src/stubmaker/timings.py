@@ -0,0 +1,95 @@
+__all__ = [
+    'PHASES',
+    'Timings',
+]
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+PHASES = ('import', 'build', 'render', 'write')
+
+
+class Timings:
+    """Durations in seconds of phases of stub generation by module.
+
+    Phases are importing (or statically building) a module, building its representations tree, rendering the stub and
+    writing it to disk. Note that definitions are built lazily, so building definitions of members reached only while
+    rendering counts towards the render phase. Stubs are streamed to disk as they are rendered, so the write phase
+    covers only moving the complete stub in place.
+
+    Parameters:
+        modules: a dictionary from module name to the dictionary from phase to its duration.
+    """
+
+    def __init__(self, modules: Optional[Dict[str, Dict[str, float]]] = None):
+        self.modules = modules or {}
+
+    def add(self, module_name: str, phase: str, duration: float):
+        module_durations = self.modules.setdefault(module_name, {})
+        module_durations[phase] = module_durations.get(phase, 0.0) + duration
+
+    def update(self, modules: Dict[str, Dict[str, float]]):
+        """Adds durations measured elsewhere, e.g. in a worker process"""
+        for module_name, module_durations in modules.items():
+            for phase, duration in module_durations.items():
+                self.add(module_name, phase, duration)
+
+    @contextmanager
+    def measure(self, module_name: str, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(module_name, phase, time.perf_counter() - start)
+
+    def get_phase_totals(self) -> Dict[str, float]:
+        totals = {phase: 0.0 for phase in PHASES}
+        for module_durations in self.modules.values():
+            for phase, duration in module_durations.items():
+                totals[phase] = totals.get(phase, 0.0) + duration
+        return totals
+
+    def get_sorted_modules(self) -> List[str]:
+        """Returns module names from the most to the least expensive"""
+        return sorted(self.modules, key=lambda module_name: (-sum(self.modules[module_name].values()), module_name))
+
+    def to_json(self, wall_time: Optional[float] = None) -> dict:
+        phase_totals = self.get_phase_totals()
+        return {
+            'wall_time': wall_time,
+            'total': sum(phase_totals.values()),
+            'phases': phase_totals,
+            'modules': [
+                {
+                    'module': module_name,
+                    'total': sum(self.modules[module_name].values()),
+                    'phases': {phase: self.modules[module_name].get(phase, 0.0) for phase in PHASES},
+                }
+                for module_name in self.get_sorted_modules()
+            ],
+        }
+
+    def format(self, wall_time: Optional[float] = None, limit: Optional[int] = None) -> str:
+        """Formats a human-readable report with aggregated phases followed by `limit` most expensive modules"""
+
+        phase_totals = self.get_phase_totals()
+        total = sum(phase_totals.values())
+        lines = [f'Stub generation took {total:.3f}s' + (f' ({wall_time:.3f}s wall time)' if wall_time else '')]
+        for phase, duration in sorted(phase_totals.items(), key=lambda item: -item[1]):
+            share = duration / total * 100 if total else 0.0
+            lines.append(f'  {phase:<8}{duration:>10.3f}s{share:>7.1f}%')
+
+        module_names = self.get_sorted_modules()
+        if limit is not None:
+            module_names = module_names[:limit]
+        if module_names:
+            width = max(len('module'), *(len(module_name) for module_name in module_names))
+            lines.append('')
+            lines.append(f'{"module":<{width}}{"total":>10}' + ''.join(f'{phase:>10}' for phase in PHASES))
+            for module_name in module_names:
+                module_durations = self.modules[module_name]
+                lines.append(
+                    f'{module_name:<{width}}{sum(module_durations.values()):>9.3f}s'
+                    + ''.join(f'{module_durations.get(phase, 0.0):>9.3f}s' for phase in PHASES)
+                )
+        return '\n'.join(lines) + '\n'
@@ -4,7 +4,8 @@ __all__ = [
 
 import enum
 import inspect
-from typing import ForwardRef
+from collections import defaultdict, deque
+from typing import Callable, DefaultDict, Deque, ForwardRef, List, Optional, Set
 
 from stubmaker.builder.common import BaseRepresentation, BaseDefinition
 from stubmaker.builder.definitions import (
@@ -174,28 +175,56 @@ class BasicViewer(ViewerBase):
             ids.add(child.id)
         return ids
 
-    def get_used_members_ids(self, module_def):
-        used_object_ids = set()
-        # initialize used_object_ids with definitions from __all__ (and the __all__ definition itself)
-        for representation in self.iter_over(module_def):
-            if representation.name != '__all__' and representation.name not in module_def.obj.__all__:
-                continue
-
-            used_object_ids.update(self.get_subtree_ids(representation))
-
-        # grow used_object_ids with new definitions until it converges: present definitions may reference literals that
-        # reference other definitions in the same module or imports, which in their turn may reference other literals
-        converged = False
-        while not converged:
-            new_objects_ids = set()
-
-            for representation in self.iter_over(module_def):
-                for child_rep in self.traverse(representation):
-                    if isinstance(child_rep, BaseDefinition) and child_rep.id in used_object_ids:
-                        new_objects_ids.update(self.get_subtree_ids(representation))
-                        break
-
-            converged = new_objects_ids.issubset(used_object_ids)
-            used_object_ids.update(new_objects_ids)
+    def get_used_members_ids(
+        self, module_def, visitor: Optional[Callable[[BaseRepresentation], None]] = None
+    ) -> Set[int]:
+        """Returns ids of representations used in module stubs.
+
+        A module member is used if it is specified in __all__ (or is the __all__ definition itself) or if any
+        definition in its subtree is referenced from a used member: present definitions may reference literals that
+        reference other definitions in the same module or imports, which in their turn may reference other literals.
+        The graph from definition ids to members containing them is built in a single traversal and used members are
+        then found with a breadth-first search.
+
+        Note that the traversal builds every member defined in the module, used or not: a reference may match any
+        definition in a member subtree (e.g. a nested class or a class attribute holding the referenced object), which
+        can't be found without building the member. Only members imported into the module are never built.
+
+        Args:
+            module_def: module definition to analyze.
+            visitor: if specified, it is called for every representation in the module subtree during the traversal.
+                Allows to collect other module data without traversing the module once again.
+        """
+
+        all_names = set(module_def.obj.__all__)
+        members_subtree_ids: List[Set[int]] = []
+        members_by_definition_id: DefaultDict[int, List[int]] = defaultdict(list)
+        is_member_used = bytearray()
+        queue: Deque[int] = deque()
+
+        for member_index, representation in enumerate(self.iter_over(module_def)):
+            subtree_ids = set()
+            for child_rep in self.traverse(representation):
+                if visitor is not None:
+                    visitor(child_rep)
+                subtree_ids.add(child_rep.id)
+                if isinstance(child_rep, BaseDefinition):
+                    members_by_definition_id[child_rep.id].append(member_index)
+            members_subtree_ids.append(subtree_ids)
+
+            is_seed = representation.name == '__all__' or representation.name in all_names
+            is_member_used.append(is_seed)
+            if is_seed:
+                queue.append(member_index)
+
+        used_object_ids: Set[int] = set()
+        while queue:
+            new_object_ids = members_subtree_ids[queue.popleft()] - used_object_ids
+            used_object_ids.update(new_object_ids)
+            for object_id in new_object_ids:
+                for member_index in members_by_definition_id.get(object_id, ()):
+                    if not is_member_used[member_index]:
+                        is_member_used[member_index] = True
+                        queue.append(member_index)
 
         return used_object_ids
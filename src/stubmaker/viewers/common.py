@@ -4,19 +4,51 @@ __all__ = [
 ]
 import functools
 import inspect
+from typing import Callable, Dict, Optional, Tuple
 
 from stubmaker.builder.common import BaseRepresentation
 
 
 def singledispatchmethod(func):
-    dispatcher = functools.singledispatch(func)
-    signature = inspect.signature(func)
+    """Makes a method dispatching on the class of its first argument after self.
 
-    def wrapper(*args, **kwargs):
-        dispatch_type = signature.bind(*args, **kwargs).args[1].__class__
-        return dispatcher.dispatch(dispatch_type)(*args, **kwargs)
+    Implementations are resolved once for every pair of viewer class and argument class. Proxies registered by
+    add_inherited_singledispatchmethod are resolved to the method they proxy in the viewer class, so calls skip both
+    the dispatch and the proxy. Methods replaced on a viewer instance are still called instead of those of its class.
+    """
 
-    wrapper.register = dispatcher.register
+    dispatcher = functools.singledispatch(func)
+    argument_name = list(inspect.signature(func).parameters)[1]
+    implementations: Dict[Tuple[type, type], Tuple[Optional[str], Callable]] = {}
+
+    def resolve(viewer_cls, argument_cls):
+        implementation = dispatcher.dispatch(argument_cls)
+        mapped_member_name = getattr(implementation, 'mapped_member_name', None)
+        if mapped_member_name is not None:
+            return mapped_member_name, getattr(viewer_cls, mapped_member_name)
+        return None, implementation
+
+    def wrapper(self, *args, **kwargs):
+        # Implementations may name the argument differently, so it is always passed positionally
+        if args:
+            argument, args = args[0], args[1:]
+        else:
+            argument = kwargs.pop(argument_name)
+        key = (self.__class__, argument.__class__)
+        entry = implementations.get(key)
+        if entry is None:
+            entry = implementations[key] = resolve(*key)
+        mapped_member_name, implementation = entry
+        if mapped_member_name is not None and mapped_member_name in vars(self):
+            return getattr(self, mapped_member_name)(argument, *args, **kwargs)
+        return implementation(self, argument, *args, **kwargs)
+
+    def register(cls, func=None):
+        implementations.clear()
+        return dispatcher.register(cls, func)
+
+    wrapper.register = register
+    wrapper.dispatch = dispatcher.dispatch
     wrapper.registry = dispatcher.registry
     functools.update_wrapper(wrapper, func)
     return wrapper
@@ -55,6 +87,7 @@ def add_inherited_singledispatchmethod(method_name, implementation_prefix):
                 def proxy(self, representation: annotation, mapped_member_name=member_name):
                     return getattr(self, mapped_member_name)(representation)
 
+                proxy.mapped_member_name = member_name
                 getattr(cls, method_name).register(annotation, proxy)
         return cls
 
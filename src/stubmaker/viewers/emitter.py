@@ -0,0 +1,79 @@
+__all__ = [
+    'Emitter',
+]
+from contextlib import contextmanager
+from typing import Iterator, TextIO
+
+
+class Emitter:
+    """Writes text to an output prefixing lines with the current indentation.
+
+    Lines are indented the same way as `textwrap.indent` does it: lines consisting only of whitespace are left as is.
+    The indentation of a line is the one current when its first non-whitespace character is written, so indented blocks
+    are expected to start at the beginning of a line.
+    Text is written to the output as soon as possible except for the trailing whitespace lines which are held back until
+    more text is written, so that the output can be ended with a single line break (see `end`) without reading it back.
+
+    Parameters:
+        output: file-like object to write text to.
+        tabulation: indentation added by each level.
+    """
+
+    def __init__(self, output: TextIO, tabulation: str = ' ' * 4):
+        self.output = output
+        self.tabulation = tabulation
+        self.level = 0
+        self._prefix = ''
+        # Whitespace lines (along with the line break ending the last non-whitespace line) that are not written yet
+        self._held = ''
+        # Whitespace written at the beginning of the current line that is not written yet
+        self._line_start = ''
+        self._in_line = False
+
+    @contextmanager
+    def indented(self) -> Iterator['Emitter']:
+        self.level += 1
+        self._prefix = self.tabulation * self.level
+        try:
+            yield self
+        finally:
+            self.level -= 1
+            self._prefix = self.tabulation * self.level
+
+    @property
+    def ends_with_blank_line(self) -> bool:
+        return not self._in_line and not self._line_start and self._held.endswith('\n\n')
+
+    def write(self, text: str):
+        for index, part in enumerate(text.split('\n')):
+            if index:
+                self._end_line()
+            if not part:
+                continue
+            if self._in_line:
+                self.output.write(part)
+            elif part.isspace():
+                self._line_start += part
+            else:
+                self.output.write(f'{self._held}{self._prefix}{self._line_start}{part}')
+                self._held = self._line_start = ''
+                self._in_line = True
+
+    def _end_line(self):
+        if self._in_line:
+            self._held = '\n'
+            self._in_line = False
+        else:
+            self._held += f'{self._line_start}\n'
+            self._line_start = ''
+
+    def flush(self):
+        """Writes the held back whitespace"""
+        self.output.write(f'{self._held}{self._line_start}')
+        self._held = self._line_start = ''
+
+    def end(self):
+        """Ends the output with a single line break dropping the held back line breaks"""
+        self.output.write(f'{self._held}{self._line_start}'.rstrip('\n') + '\n')
+        self._held = self._line_start = ''
+        self._in_line = False
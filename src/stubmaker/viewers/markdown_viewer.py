@@ -11,12 +11,13 @@ import re
 
 from docstring_parser import Docstring
 from markdown_it import MarkdownIt
+from functools import lru_cache
 from io import StringIO
 from itertools import groupby, chain, islice
-from typing import Optional, Callable
+from typing import Optional, Callable, Pattern, Tuple
 
 from stubmaker.viewers.basic_viewer import BasicViewer
-from stubmaker.viewers.util import wrap_function_signature, replace_representations_in_signature
+from stubmaker.viewers.util import view_signature
 from stubmaker.builder.common import BaseRepresentation, BaseDefinition
 from stubmaker.builder.definitions import (
     AttributeAnnotationDef,
@@ -40,11 +41,17 @@ def get_markdown_page(name, full_name, markdown_view, source_link=None):
     return sio.getvalue()
 
 
+# Parser of parameter descriptions. Configuring a parser is much more expensive than rendering short descriptions, so
+# a single parser is shared: rendering does not change its state
+_description_markdown = MarkdownIt()
+_description_markdown['block'].ruler.enableOnly(['list', 'paragraph'])
+_description_markdown['inline'].ruler.enableOnly([])
+
+_SQUARE_BRACKETS_PATTERN = re.compile(r'[\[\]]')
+
+
 def parameter_html_description(desc: str) -> str:
-    md = MarkdownIt()
-    md['block'].ruler.enableOnly(['list', 'paragraph'])
-    md['inline'].ruler.enableOnly([])
-    description = md.render(desc)
+    description = _description_markdown.render(desc)
     description = (
         description.replace("'", '&#x27;')  # markdown-it-py does not escape single quotes
         .replace('Default value:', '</p><p>Default value:')
@@ -92,6 +99,12 @@ def docstring_description_to_md_description(parsed_docstring: Docstring) -> str:
     return sio.getvalue()
 
 
+@lru_cache(maxsize=1024)
+def _get_crosslinks_pattern(names: Tuple[str, ...]) -> Pattern:
+    # Longer names go first so that qualified names are linked as a whole instead of their last components
+    return re.compile(r'\b(?:{})\b'.format('|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))))
+
+
 class MarkdownViewer(BasicViewer):
     _ATTRIBUTES_TABLE = """| Parameters | Type | Description |
 | :----------| :----| :-----------|\n"""
@@ -110,14 +123,16 @@ class MarkdownViewer(BasicViewer):
         if not annotation or annotation is inspect.Parameter.empty:
             return ''
         str_annotation = self.view(annotation)
-        str_annotation = re.sub(r'[\[\]]', r'\\\g<0>', str_annotation)
+        str_annotation = _SQUARE_BRACKETS_PATTERN.sub(r'\\\g<0>', str_annotation)
         links = {}
         for child in self.traverse(annotation):
             if child.full_name and child.full_name.startswith(child.tree.module_root + '.'):
-                links[self.view(child)] = f'[{self.view(child)}]({child.full_name}.md)'
-        for key, value in links.items():
-            str_annotation = re.sub(r'\b{}\b'.format(key), value, str_annotation)
-        return str_annotation
+                child_name = self.view(child)
+                links[child_name] = f'[{child_name}]({child.full_name}.md)'
+        if not links:
+            return str_annotation
+        # All the links are applied in a single pass so that names inside inserted links are not linked again
+        return _get_crosslinks_pattern(tuple(links)).sub(lambda match: links[match.group()], str_annotation)
 
     def get_markdown_files_for_module(self, module_def: ModuleDef):
         used_object_ids = self.get_used_members_ids(module_def)
@@ -179,31 +194,33 @@ class MarkdownViewer(BasicViewer):
                 class_doc_sio.write('## Parameters Description\n\n')
                 class_doc_sio.write(self._ATTRIBUTES_TABLE)
                 for param in parsed_docstring.params:
-                    nested_parameters = param.arg_name.split('.')
+                    # Parsed docstrings are shared, so they are not modified
+                    param_kind, param_name = param.args[0], param.arg_name
+                    nested_parameters = param_name.split('.')
                     if len(nested_parameters) > 1:
                         # expanded nested parameter
-                        param.args[0] = 'param'
-                        param.arg_name = nested_parameters[-1]
+                        param_kind = 'param'
+                        param_name = nested_parameters[-1]
 
-                    if param.args[0] == 'attribute':
-                        arg_with_annotations = class_def.annotations.get(param.arg_name)
+                    if param_kind == 'attribute':
+                        arg_with_annotations = class_def.annotations.get(param_name)
                         str_annotation = ''
                         if arg_with_annotations:
                             annotation = arg_with_annotations.annotation
                             str_annotation = self.add_markdown_crosslinks(annotation)
 
                         class_doc_sio.write(
-                            f'`{param.arg_name}`|**{str_annotation or "-"}**|'
+                            f'`{param_name}`|**{str_annotation or "-"}**|'
                             f'{parameter_html_description(param.description)}\n'
                         )
 
-                    elif param.args[0] == 'param':
-                        parameter = class_def.init_method.get_parameter(param.arg_name)
+                    elif param_kind == 'param':
+                        parameter = class_def.init_method.get_parameter(param_name)
                         annotation = parameter and parameter.annotation
                         str_annotation = self.add_markdown_crosslinks(annotation)
 
                         class_doc_sio.write(
-                            f'`{param.arg_name}`|**{str_annotation or "-"}**|'
+                            f'`{param_name}`|**{str_annotation or "-"}**|'
                             f'{parameter_html_description(param.description)}\n'
                         )
 
@@ -269,13 +286,9 @@ class MarkdownViewer(BasicViewer):
         )
 
     def get_definition_markdown_signature(self, function_def: FunctionDef):
-        signature = replace_representations_in_signature(function_def.signature, self)
-        if not signature.return_annotation or (
-            signature.return_annotation is not inspect.Parameter.empty and not signature.return_annotation.name
-        ):
-            signature = signature.replace(return_annotation=inspect.Parameter.empty)
-        wrapped_signature = wrap_function_signature(signature)
-        return wrapped_signature
+        return_annotation = function_def.signature.return_annotation
+        with_return_annotation = return_annotation is inspect.Parameter.empty or bool(return_annotation.name)
+        return view_signature(function_def.signature, self, with_return_annotation=with_return_annotation)
 
     def view_function_definition(self, function_def: FunctionDef):
         sio = StringIO()
@@ -286,7 +299,7 @@ class MarkdownViewer(BasicViewer):
         sio.write(self.get_definition_markdown_signature(function_def))
         sio.write('\n```\n\n')
 
-        signature = replace_representations_in_signature(function_def.signature, self)
+        signature = function_def.signature
 
         if function_def.docstring:
             parsed_docstring = function_def.docstring.get_parsed()
@@ -1,12 +1,13 @@
 __all__ = [
     'StubViewer',
 ]
+import functools
 import inspect
 import sys
 from io import StringIO
-from typing import Dict, Iterable, Mapping, Tuple, Optional, Set, List
+from typing import Any, Callable, Dict, Iterable, Mapping, TextIO, Tuple, Optional, Set, List
 
-from stubmaker.builder.common import BaseDefinition
+from stubmaker.builder.common import BaseDefinition, BaseLiteral, BaseRepresentation
 from stubmaker.builder.definitions import (
     AttributeAnnotationDef,
     AttributeDef,
@@ -22,26 +23,89 @@ from stubmaker.builder.definitions import (
 from stubmaker.builder.literals import ReferenceLiteral, TypeVarLiteral
 from stubmaker.viewers.basic_viewer import BasicViewer
 from stubmaker.viewers.common import add_inherited_singledispatchmethod
+from stubmaker.viewers.emitter import Emitter
 from stubmaker.viewers.util import (
-    wrap_function_signature,
     indent,
-    replace_representations_in_signature,
     get_common_namespace_prefix,
+    view_signature,
 )
 
 
+def memoize_in_module_context(view_method):
+    """Makes a literal view method reuse views of identical literals rendered in the current ModuleContext"""
+
+    @functools.wraps(view_method)
+    def wrapper(self, literal):
+        if self._module_context is None:
+            return view_method(self, literal)
+        return self._module_context.get_literal_view(literal, functools.partial(view_method, self))
+
+    return wrapper
+
+
+def is_overridden_by_view(viewer_cls, view_name: str, write_name: str) -> bool:
+    """Returns whether view_name method of viewer_cls is defined in a subclass of the class defining write_name method.
+
+    Viewers based on StubViewer may customize rendering of a definition by overriding either its `view_*` or its
+    `write_*` method, so the method defined in the most derived class is used.
+    """
+
+    view_owner = next(cls for cls in viewer_cls.__mro__ if view_name in vars(cls))
+    write_owner = next(cls for cls in viewer_cls.__mro__ if write_name in vars(cls))
+    return view_owner is not write_owner and issubclass(view_owner, write_owner)
+
+
+# Results of is_written_by_view by viewer class and representation class
+_written_by_view: Dict[Tuple[type, type], bool] = {}
+
+
+def is_written_by_view(viewer_cls, representation_cls: type) -> bool:
+    """Returns whether representations of representation_cls should be written by viewer_cls through `view`"""
+
+    written_by_view = _written_by_view.get((viewer_cls, representation_cls))
+    if written_by_view is None:
+        view_name = getattr(viewer_cls.view.dispatch(representation_cls), 'mapped_member_name', None)
+        write_name = getattr(viewer_cls.write.dispatch(representation_cls), 'mapped_member_name', None)
+        written_by_view = _written_by_view[viewer_cls, representation_cls] = (
+            view_name is not None
+            and write_name is not None
+            and is_overridden_by_view(viewer_cls, view_name, write_name)
+        )
+    return written_by_view
+
+
+@add_inherited_singledispatchmethod(method_name='write', implementation_prefix='write_')
 @add_inherited_singledispatchmethod(method_name='iter_over', implementation_prefix='iter_over')
 @add_inherited_singledispatchmethod(method_name='view', implementation_prefix='view_')
 class StubViewer(BasicViewer):
+    """Renders stubs.
+
+    Definitions containing other definitions (modules, classes and functions) are written to an Emitter by `write_*`
+    methods, so that nested definitions are indented while being written instead of being rendered to strings and
+    re-indented at every level. Their `view_*` methods write to a string. Use `stream` to write a view to a file.
+
+    Subclasses may override either `view_*` or `write_*` methods of definitions. Definitions whose `view_*` method is
+    overridden are written through `view`, so the override applies to members of modules and classes as well.
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._module_context: Optional['StubViewer.ModuleContext'] = None
+        self._emitter: Optional[Emitter] = None
+        # Totals of literal views cache hits and misses over all rendered modules
+        self.literal_views_hits = 0
+        self.literal_views_misses = 0
 
     class ModuleContext:
         def __init__(self, module_def: ModuleDef, viewer: 'StubViewer'):
             self.module_def = module_def
             self.viewer = viewer
             self.object_id_to_definition: Dict[str, BaseDefinition] = {}
+            # Views of literals keyed by literal class, object id, namespace and name. Literals are stored along with
+            # their views so that ids of their objects can't be reused while the context is active
+            self.literal_views: Dict[Tuple[type, int, str, Optional[str]], Tuple[BaseLiteral, str]] = {}
+            self.literal_views_hits = 0
+            self.literal_views_misses = 0
 
         def __enter__(self):
             self.viewer._module_context = self
@@ -49,7 +113,76 @@ class StubViewer(BasicViewer):
 
         def __exit__(self, exc_type, exc_val, exc_tb):
             self.viewer._module_context = None
+            self.viewer.literal_views_hits += self.literal_views_hits
+            self.viewer.literal_views_misses += self.literal_views_misses
             self.object_id_to_definition.clear()
+            self.literal_views.clear()
+
+        def get_literal_view(self, literal: BaseLiteral, view: Callable[[BaseLiteral], str]) -> str:
+            key = (literal.__class__, literal.id, literal.namespace, literal.name)
+            entry = self.literal_views.get(key)
+            if entry is None:
+                self.literal_views_misses += 1
+                entry = self.literal_views[key] = (literal, view(literal))
+            else:
+                self.literal_views_hits += 1
+            return entry[1]
+
+    class ModuleAnalysis:
+        """Module data required to render its stub.
+
+        Attributes:
+            used_object_ids: ids of representations that are used in the stub.
+            type_var_definitions: a dictionary from used TypeVar object id to the definition of TypeVar in the module.
+            imports: names of modules that should be imported in the stub.
+            from_imports: a dictionary from module name to names imported from the module in the stub.
+        """
+
+        def __init__(
+            self,
+            used_object_ids: Set[int],
+            type_var_definitions: Dict[int, AttributeDef],
+            imports: Set[str],
+            from_imports: Mapping[str, Set[Tuple[str, Optional[str]]]],
+        ):
+            self.used_object_ids = used_object_ids
+            self.type_var_definitions = type_var_definitions
+            self.imports = imports
+            self.from_imports = from_imports
+
+    def write(self, representation: BaseRepresentation):
+        """Writes the view of representation to the current emitter"""
+        self.emitter.write(self.view(representation))
+
+    def _write(self, representation: BaseRepresentation):
+        if is_written_by_view(self.__class__, representation.__class__):
+            self.emitter.write(self.view(representation))
+        else:
+            self.write(representation)
+
+    def stream(self, representation: BaseRepresentation, output: TextIO):
+        """Writes the view of representation to output as it is rendered"""
+        previous_emitter, self._emitter = self._emitter, Emitter(output)
+        try:
+            self._write(representation)
+            self._emitter.flush()
+        finally:
+            self._emitter = previous_emitter
+
+    def _view_with_emitter(self, write: Callable[[Any], None], representation: BaseRepresentation) -> str:
+        previous_emitter, self._emitter = self._emitter, Emitter(StringIO())
+        try:
+            write(representation)
+            self._emitter.flush()
+            return self._emitter.output.getvalue()  # type: ignore
+        finally:
+            self._emitter = previous_emitter
+
+    @property
+    def emitter(self) -> Emitter:
+        if self._emitter is None:
+            raise RuntimeError(f'{inspect.stack()[1].function} is called outside of stream or view')
+        return self._emitter
 
     @property
     def module_context(self) -> ModuleContext:
@@ -57,6 +190,11 @@ class StubViewer(BasicViewer):
             raise RuntimeError(f'{inspect.stack()[1].function} is called outside of ModuleContext')
         return self._module_context
 
+    view_enum_value_literal = memoize_in_module_context(BasicViewer.view_enum_value_literal)
+    view_type_hint_literal = memoize_in_module_context(BasicViewer.view_type_hint_literal)
+    view_value_literal = memoize_in_module_context(BasicViewer.view_value_literal)
+
+    @memoize_in_module_context
     def view_reference_literal(self, reference_lit: ReferenceLiteral):
         view = super().view_reference_literal(reference_lit)
 
@@ -65,6 +203,7 @@ class StubViewer(BasicViewer):
             return view
         return f'{import_module}.{view}'
 
+    @memoize_in_module_context
     def view_type_var_literal(self, type_var_lit: TypeVarLiteral):
         # Present name means that TypeVar is used in definition (i.e. T = TypeVar(...))
         if type_var_lit.node.name:
@@ -96,149 +235,193 @@ class StubViewer(BasicViewer):
         return not metaclass_is_type and not metaclass_is_inherited or has_unimplemeted_abstract_methods
 
     def view_base_class_definition(self, class_def: BaseClassDef):
-        sio = StringIO()
+        return self._view_with_emitter(self.write_base_class_definition, class_def)
 
-        sio.write(f'class {class_def.name}')
+    def write_base_class_definition(self, class_def: BaseClassDef):
+        emitter = self.emitter
+        emitter.write(f'class {class_def.name}')
         need_to_write_metaclass = self._do_need_to_write_metaclass(class_def)
 
         if class_def.bases and need_to_write_metaclass:
             bases = ', '.join(self.view(base) for base in class_def.bases)
-            sio.write(f'({bases}, metaclass={self.view(class_def.metaclass)})')
+            emitter.write(f'({bases}, metaclass={self.view(class_def.metaclass)})')
         elif class_def.bases:
             bases = ', '.join(self.view(base) for base in class_def.bases)
-            sio.write(f'({bases})')
+            emitter.write(f'({bases})')
         elif need_to_write_metaclass:
-            sio.write(f'(metaclass={self.view(class_def.metaclass)})')
-        sio.write(':\n')
+            emitter.write(f'(metaclass={self.view(class_def.metaclass)})')
+        emitter.write(':\n')
 
-        if class_def.docstring:
-            sio.write(indent(f'{self.view(class_def.docstring)}\n'))
+        with emitter.indented():
+            if class_def.docstring:
+                emitter.write(f'{self.view(class_def.docstring)}\n')
 
-        if class_def.members:
-            for name, rep in class_def.members.items():
-                sio.write(indent(f'{self.view(rep)}'))
+            if class_def.members:
+                for name, rep in class_def.members.items():
+                    self._write(rep)
 
-        if class_def.annotations:
-            for name, annotation in class_def.annotations.items():
-                sio.write(indent(f'{self.view(annotation)}'))
+            if class_def.annotations:
+                for name, annotation in class_def.annotations.items():
+                    self._write(annotation)
 
-        if not class_def.docstring and not class_def.members and not class_def.annotations:
-            sio.write(indent('...\n'))
+            if not class_def.docstring and not class_def.members and not class_def.annotations:
+                emitter.write('...\n')
 
-        if not sio.getvalue().endswith('\n\n'):
-            sio.write('\n')
-        return sio.getvalue()
+        if not emitter.ends_with_blank_line:
+            emitter.write('\n')
 
     def view_documentation_definition(self, documentation_def: DocumentationDef):
         return f'"""{inspect.cleandoc(documentation_def.obj).rstrip()}\n"""\n'
 
     def view_enum_definition(self, enum_def: EnumDef):
-        sio = StringIO()
+        return self._view_with_emitter(self.write_enum_definition, enum_def)
 
-        sio.write(f'class {enum_def.name}({", ".join([self.view(base) for base in enum_def.bases])}):\n')
+    def write_enum_definition(self, enum_def: EnumDef):
+        emitter = self.emitter
+        emitter.write(f'class {enum_def.name}({", ".join([self.view(base) for base in enum_def.bases])}):\n')
 
-        if enum_def.docstring:
-            sio.write(indent(f'{self.view(enum_def.docstring)}\n'))
+        with emitter.indented():
+            if enum_def.docstring:
+                emitter.write(f'{self.view(enum_def.docstring)}\n')
 
-        if enum_def.enum_dict:
-            for name, literal in enum_def.enum_dict.items():
-                sio.write(indent(f'{name} = {self.view(literal)}\n'))
-        else:
-            sio.write(indent('...\n'))
+            if enum_def.enum_dict:
+                for name, literal in enum_def.enum_dict.items():
+                    emitter.write(f'{name} = {self.view(literal)}\n')
+            else:
+                emitter.write('...\n')
 
-        sio.write('\n')
-        return sio.getvalue()
+        emitter.write('\n')
 
     def view_function_definition(self, function_def: FunctionDef):
-        sio = StringIO()
-
-        signature = replace_representations_in_signature(function_def.signature, self)
+        return self._view_with_emitter(self.write_function_definition, function_def)
 
-        wrapped_signature = wrap_function_signature(signature)
+    def write_function_definition(self, function_def: FunctionDef):
+        emitter = self.emitter
+        wrapped_signature = view_signature(function_def.signature, self)
 
         if function_def.is_async:
-            sio.write('async ')
+            emitter.write('async ')
         if function_def.docstring:
-            sio.write(f'def {function_def.name}{wrapped_signature}:\n')
-            sio.write(indent(self.view(function_def.docstring)))
-            sio.write(indent('...\n'))
+            emitter.write(f'def {function_def.name}{wrapped_signature}:\n')
+            with emitter.indented():
+                emitter.write(self.view(function_def.docstring))
+                emitter.write('...\n')
         else:
-            sio.write(f'def {function_def.name}{wrapped_signature}: ...\n')
+            emitter.write(f'def {function_def.name}{wrapped_signature}: ...\n')
 
-        sio.write('\n')
-        return sio.getvalue()
+        emitter.write('\n')
+
+    def _write_function_definition(self, function_def: FunctionDef):
+        if is_overridden_by_view(self.__class__, 'view_function_definition', 'write_function_definition'):
+            self.emitter.write(self.view_function_definition(function_def))
+        else:
+            self.write_function_definition(function_def)
 
     def view_module_definition(self, module_def: ModuleDef):
-        sio = StringIO()
+        return self._view_with_emitter(self.write_module_definition, module_def)
+
+    def write_module_definition(self, module_def: ModuleDef):
+        emitter = self.emitter
 
         with StubViewer.ModuleContext(module_def, self) as ctx:
             # docstring
             if module_def.docstring:
-                sio.write(f'{self.view(module_def.docstring)}\n')
+                emitter.write(f'{self.view(module_def.docstring)}\n')
 
             # all
             if hasattr(module_def.obj, '__all__'):
                 if module_def.obj.__all__:
-                    all_value = ',\n'.join(f'{token!r}' for token in module_def.obj.__all__)
-                    sio.write(f'__all__ = [\n{indent(all_value)},\n]\n')
+                    emitter.write('__all__ = [\n')
+                    with emitter.indented():
+                        for token in module_def.obj.__all__:
+                            emitter.write(f'{token!r},\n')
+                    emitter.write(']\n')
                 else:
-                    sio.write('__all__: list = []\n')
-
-            used_object_ids = self.get_used_members_ids(module_def)
+                    emitter.write('__all__: list = []\n')
 
-            # add used TypeVar definitions
-            for representation in self.traverse(module_def):
-                if isinstance(representation, AttributeDef) and isinstance(representation.value, TypeVarLiteral):
-                    if representation.value.id in used_object_ids:
-                        used_object_ids.add(representation.id)
-                        ctx.object_id_to_definition[representation.value.id] = representation
+            analysis = self.analyze_module_definition(module_def)
+            used_object_ids = analysis.used_object_ids
+            ctx.object_id_to_definition.update(analysis.type_var_definitions)
+            imports, from_imports = analysis.imports, analysis.from_imports
 
-            # imports
-            imports, from_imports = module_def.get_imports(used_object_ids, self.traverse)
-
-            self._write_imports_section(imports, sio)
-            self._write_from_imports_section(from_imports, sio)
+            self._write_imports_section(imports, emitter)
+            self._write_from_imports_section(from_imports, emitter)
 
             if imports or from_imports:
-                sio.write('\n')
+                emitter.write('\n')
 
             # module members
             if module_def.members:
                 for representation in self.iter_over(module_def):
                     if representation.id in used_object_ids:
-                        sio.write(self.view(representation))
-                        sio.write('\n')
+                        self._write(representation)
+                        emitter.write('\n')
+
+        emitter.end()
+
+    def analyze_module_definition(self, module_def: ModuleDef) -> 'StubViewer.ModuleAnalysis':
+        """Collects used representations, TypeVar definitions and imports in a single traversal over module_def"""
+
+        type_var_definitions: List[AttributeDef] = []
+        representations: List[BaseRepresentation] = []
+
+        def visitor(representation: BaseRepresentation):
+            if isinstance(representation, AttributeDef) and isinstance(representation.value, TypeVarLiteral):
+                type_var_definitions.append(representation)
+            representations.append(representation)
 
-        return sio.getvalue().rstrip('\n') + '\n'
+        used_object_ids = self.get_used_members_ids(module_def, visitor)
 
-    def _write_from_imports_section(self, from_imports: Mapping[str, Set[Tuple[str, Optional[str]]]], sio: StringIO):
+        # add used TypeVar definitions
+        used_type_var_definitions = {}
+        for definition in type_var_definitions:
+            if definition.value.id in used_object_ids:
+                used_object_ids.add(definition.id)
+                used_type_var_definitions[definition.value.id] = definition
+
+        imports = module_def.get_imports_for_representations(
+            representation for representation in representations if representation.id in used_object_ids
+        )
+        return StubViewer.ModuleAnalysis(
+            used_object_ids, used_type_var_definitions, imports, module_def.get_from_imports_for_all()
+        )
+
+    def _write_from_imports_section(self, from_imports: Mapping[str, Set[Tuple[str, Optional[str]]]], emitter: Emitter):
         if from_imports:
             for key in sorted(from_imports.keys()):
-                self._write_from_import(key, sorted(from_imports[key], key=lambda x: x[0]), sio)
-            sio.write('\n')
+                self._write_from_import(key, sorted(from_imports[key], key=lambda x: x[0]), emitter)
+            emitter.write('\n')
 
-    def _write_from_import(self, module_name: str, names: List[Tuple[str, Optional[str]]], sio: StringIO):
+    def _write_from_import(self, module_name: str, names: List[Tuple[str, Optional[str]]], emitter: Emitter):
         if len(names) > 1:
             names_str = ',\n'.join(f'{name} as {import_as}' if import_as else name for name, import_as in names)
-            sio.write(f'from {module_name} import (\n{indent(names_str)},\n)\n')
+            emitter.write(f'from {module_name} import (\n{indent(names_str)},\n)\n')
         else:
             names_str = ', '.join(f'{name} as {import_as}' if import_as else name for name, import_as in names)
-            sio.write(f'from {module_name} import {names_str}\n')
+            emitter.write(f'from {module_name} import {names_str}\n')
 
-    def _write_imports_section(self, imports: Iterable[str], sio: StringIO):
+    def _write_imports_section(self, imports: Iterable[str], emitter: Emitter):
         if imports:
             for name in sorted(imports):
-                self._write_import(name, sio)
-            sio.write('\n')
+                self._write_import(name, emitter)
+            emitter.write('\n')
 
-    def _write_import(self, module_name: str, sio: StringIO):
-        sio.write(f'import {module_name}\n')
+    def _write_import(self, module_name: str, emitter: Emitter):
+        emitter.write(f'import {module_name}\n')
 
     def view_class_method_definition(self, class_method_definition: ClassMethodDef):
-        return f'@classmethod\n{self.view_function_definition(class_method_definition)}'
+        return self._view_with_emitter(self.write_class_method_definition, class_method_definition)
+
+    def write_class_method_definition(self, class_method_definition: ClassMethodDef):
+        self.emitter.write('@classmethod\n')
+        self._write_function_definition(class_method_definition)
 
     def view_static_method_definition(self, static_method_definition: StaticMethodDef):
-        return f'@staticmethod\n{self.view_function_definition(static_method_definition)}'
+        return self._view_with_emitter(self.write_static_method_definition, static_method_definition)
+
+    def write_static_method_definition(self, static_method_definition: StaticMethodDef):
+        self.emitter.write('@staticmethod\n')
+        self._write_function_definition(static_method_definition)
 
     def iter_over_class_definition(self, class_def: ClassDef):
         if class_def.docstring:
@@ -2,8 +2,11 @@ __all__ = [
     'wrap_function_signature',
     'indent',
     'replace_representations_in_signature',
+    'view_parameter',
+    'view_signature',
     'get_common_namespace_prefix',
 ]
+import functools
 import inspect
 import textwrap
 
@@ -37,21 +40,21 @@ def _split_str_signature_by_params(signature: inspect.Signature) -> Tuple[str, L
     return prefix, params_str, postfix
 
 
-def wrap_function_signature(
-    signature: inspect.Signature, max_args_on_line: int = 1, min_args_to_wrap: int = 2, wrap_self: bool = True
+def _wrap_params(
+    parameters_names: List[str],
+    prefix: str,
+    params_str: List[str],
+    postfix: str,
+    max_args_on_line: int,
+    wrap_self: bool,
 ) -> str:
-    if len(signature.parameters) <= min_args_to_wrap:
-        return str(signature)
-
-    prefix, params_str, postfix = _split_str_signature_by_params(signature)
-
-    if 'self' not in signature.parameters:
+    if 'self' not in parameters_names:
         wrap_self = False
 
     wrapped_params_str = []
 
     start_from = 0
-    if wrap_self and next(iter(signature.parameters), '') == 'self':
+    if wrap_self and next(iter(parameters_names), '') == 'self':
         prefix = prefix + '\n'
         wrapped_params_str.append(params_str[0])
         start_from = 1
@@ -63,24 +66,126 @@ def wrap_function_signature(
     return f'{prefix}{indent(",".join(wrapped_params_str))}\n{postfix}'
 
 
+def wrap_function_signature(
+    signature: inspect.Signature, max_args_on_line: int = 1, min_args_to_wrap: int = 2, wrap_self: bool = True
+) -> str:
+    if len(signature.parameters) <= min_args_to_wrap:
+        return str(signature)
+
+    prefix, params_str, postfix = _split_str_signature_by_params(signature)
+    return _wrap_params(list(signature.parameters), prefix, params_str, postfix, max_args_on_line, wrap_self)
+
+
+def view_parameter(parameter: inspect.Parameter, viewer) -> str:
+    """Same as str(parameter) with representations in annotation and default viewed by viewer"""
+
+    formatted = parameter.name
+    if parameter.annotation is not inspect.Parameter.empty:
+        formatted = f'{formatted}: {viewer.view(parameter.annotation)}'
+    if parameter.default is not inspect.Parameter.empty:
+        separator = '=' if parameter.annotation is inspect.Parameter.empty else ' = '
+        formatted = f'{formatted}{separator}{viewer.view(parameter.default)}'
+
+    if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+        formatted = '*' + formatted
+    elif parameter.kind == inspect.Parameter.VAR_KEYWORD:
+        formatted = '**' + formatted
+    return formatted
+
+
+def view_signature(
+    signature: inspect.Signature,
+    viewer,
+    with_return_annotation: bool = True,
+    max_args_on_line: int = 1,
+    min_args_to_wrap: int = 2,
+    wrap_self: bool = True,
+) -> str:
+    """Renders a signature containing representations with the viewer.
+
+    The result is the same as of `wrap_function_signature(replace_representations_in_signature(signature, viewer))`
+    but parameters are rendered once, directly from the signature, instead of being searched for in `str(signature)`.
+
+    Args:
+        signature: signature with representations as annotations and defaults.
+        viewer: viewer used to render representations.
+        with_return_annotation: whether the return annotation should be rendered.
+        max_args_on_line: maximum number of parameters on a line of a wrapped signature.
+        min_args_to_wrap: signatures with no more parameters than this are not wrapped.
+        wrap_self: whether `self` parameter should be placed on a separate line.
+    """
+
+    # Parameters and "/", "*" separators as they are placed by str(signature)
+    items = []
+    # Parameters and separators as they are placed in a wrapped signature: only one separator is kept between two
+    # parameters
+    params_str: List[str] = []
+    prefix = '('
+    render_pos_only_separator = False
+    render_kw_only_separator = True
+
+    for parameter in signature.parameters.values():
+        separators = []
+        if parameter.kind == inspect.Parameter.POSITIONAL_ONLY:
+            render_pos_only_separator = True
+        elif render_pos_only_separator:
+            separators.append('/')
+            render_pos_only_separator = False
+        if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+            render_kw_only_separator = False
+        elif parameter.kind == inspect.Parameter.KEYWORD_ONLY and render_kw_only_separator:
+            separators.append('*')
+            render_kw_only_separator = False
+
+        if separators:
+            if not params_str:
+                # Wrapped signatures starting with a keyword-only parameter have no opening parenthesis
+                prefix = ''
+            params_str.append(separators[-1])
+
+        param_str = view_parameter(parameter, viewer)
+        items.extend(separators)
+        items.append(param_str)
+        params_str.append(param_str)
+
+    return_annotation_str = ''
+    if with_return_annotation and signature.return_annotation is not inspect.Signature.empty:
+        return_annotation_str = f' -> {viewer.view(signature.return_annotation)}'
+
+    if len(signature.parameters) <= min_args_to_wrap:
+        if render_pos_only_separator:
+            items.append('/')
+        return f'({", ".join(items)}){return_annotation_str}'
+
+    postfix = f'{", /" if render_pos_only_separator else ""}){return_annotation_str}'
+    return _wrap_params(list(signature.parameters), prefix, params_str, postfix, max_args_on_line, wrap_self)
+
+
 def indent(string: str, level: int = 1, tabulation: str = ' ' * 4) -> str:
     return textwrap.indent(string, tabulation * level)
 
 
-def get_view_adapter(representation, viewer):
-    class Adapter(type(representation)):
-        def __init__(self, wrapped_obj):
+@functools.lru_cache(maxsize=None)
+def get_view_adapter_class(representation_cls):
+    # Adapter classes are created once per representation class so that viewers' dispatch caches stay bounded
+    class Adapter(representation_cls):
+        def __init__(self, wrapped_obj, viewer):
             self.wrapped_obj = wrapped_obj
+            self.viewer = viewer
 
         def __getattr__(self, item):
             return getattr(self.wrapped_obj, item)
 
         def __str__(self):
-            return viewer.view(self.wrapped_obj)
+            return self.viewer.view(self.wrapped_obj)
 
         __repr__ = __str__
 
-    return Adapter(representation)
+    return Adapter
+
+
+def get_view_adapter(representation, viewer):
+    return get_view_adapter_class(type(representation))(representation, viewer)
 
 
 def replace_representations_in_signature(signature: inspect.Signature, viewer):
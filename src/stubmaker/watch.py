@@ -0,0 +1,61 @@
+__all__ = [
+    'SourcesWatcher',
+]
+import os
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from stubmaker.manifest import get_file_hash
+
+
+class SourcesWatcher:
+    """Polls a directory for changes of python source files.
+
+    Files are stat-ed on every poll and hashed only if their modification time or size changed, so touching a file
+    without changing its content is not reported as a change.
+
+    Parameters:
+        sources_path: path to the directory to watch.
+    """
+
+    def __init__(self, sources_path: str):
+        self.sources_path = sources_path
+        # Modification time, size and hash by path
+        self._files: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        self.poll()
+
+    def _iter_source_paths(self) -> Iterator[str]:
+        for dir_path, dir_names, file_names in os.walk(self.sources_path):
+            dir_names[:] = [name for name in dir_names if not name.startswith('.') and name != '__pycache__']
+            for file_name in file_names:
+                if file_name.endswith('.py'):
+                    yield os.path.join(dir_path, file_name)
+
+    def poll(self) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Returns paths of modified, added and removed source files since the previous poll"""
+
+        modified, added = set(), set()
+        files = {}
+        for path in self._iter_source_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            entry = self._files.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                files[path] = entry
+                continue
+
+            try:
+                file_hash = get_file_hash(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+            if entry is None:
+                added.add(path)
+            elif entry[2] != file_hash:
+                modified.add(path)
+
+        removed = set(self._files) - set(files)
+        self._files = files
+        return modified, added, removed
@@ -1,10 +1,31 @@
+import importlib.util
+import inspect
+import io
+import json
+import logging
 import os
 
 import pytest
+import queue
+import shutil
 import subprocess
+import sys
+import threading
+import types
 
 from functools import partial
 from setuptools import findall
+from typing import List
+
+import make_stubs
+
+from stubmaker import generate_stubs
+from stubmaker.api import render_stub
+from stubmaker.builder import IntrospectionCache, ModulesAliasesMapping, ObjectIndex, override_module_import_path
+from stubmaker.builder.definitions import FunctionDef
+from stubmaker.builder.representations_tree_builder import RepresentationsTreeBuilder
+from stubmaker.viewers.common import ViewerBase, add_inherited_singledispatchmethod
+from stubmaker.viewers.stub_viewer import StubViewer
 
 
 TEST_DIR = os.path.dirname(__file__)
@@ -17,8 +38,12 @@ get_input_path = partial(os.path.join, TEST_DIR, 'test_package')
 get_expected_stub = partial(os.path.join, TEST_DIR, 'expected_stubs')
 
 
-@pytest.fixture(scope='session')
-def get_output_path(tmpdir_factory):
+@pytest.fixture(
+    scope='session',
+    params=[['--jobs', '1'], ['--jobs', '2'], ['--static']],
+    ids=['serial', 'parallel', 'static'],
+)
+def get_output_path(request, tmpdir_factory):
     """Applies stubmaker and returns results dir"""
     output_path = str(tmpdir_factory.mktemp('output'))
     process = subprocess.run(
@@ -29,6 +54,7 @@ def get_output_path(tmpdir_factory):
             '--output-dir', output_path,
             '--described-objects', os.path.join(TEST_DIR, 'test_described_objects.py'),
             '--modules-aliases', os.path.join(TEST_DIR, 'test_modules_aliases.json'),
+            *request.param,
         ],
         stderr=subprocess.PIPE, text=True,
     )
@@ -48,3 +74,516 @@ def test_generated_stub_file_is_same(module_path, get_output_path):
     with open(get_output_path(module_path + 'i')) as stub_file:
         with open(get_expected_stub(module_path + 'i')) as expected_stub:
             assert expected_stub.read() == stub_file.read()
+
+
+@pytest.fixture
+def restore_import_state():
+    """Removes finders and modules added by a test"""
+    meta_path = list(sys.meta_path)
+    module_names = set(sys.modules)
+    yield
+    sys.meta_path[:] = meta_path
+    for module_name in set(sys.modules) - module_names:
+        del sys.modules[module_name]
+
+
+def get_module_name(module_path):
+    """Returns the name of test_package module by its path relative to test_package"""
+    module_name_parts = ['test_package', *os.path.splitext(module_path)[0].split(os.sep)]
+    if module_name_parts[-1] == '__init__':
+        module_name_parts.pop()
+    return '.'.join(module_name_parts)
+
+
+def test_generate_stubs_in_process(tmp_path, restore_import_state):
+    # Described objects refer to test_package, so it should be imported from test sources
+    override_module_import_path('test_package', get_input_path())
+    described_objects_path = os.path.join(TEST_DIR, 'test_described_objects.py')
+    spec = importlib.util.spec_from_file_location('described_objects', described_objects_path)
+    described_objects = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(described_objects)
+    with open(os.path.join(TEST_DIR, 'test_modules_aliases.json')) as aliases_file:
+        modules_aliases = json.load(aliases_file)
+
+    expected_stubs = {}
+    for module_path in get_module_paths():
+        with open(get_expected_stub(module_path + 'i')) as expected_stub:
+            expected_stubs[module_path] = expected_stub.read()
+
+    # Package is imported once, finders overriding its import path are not duplicated
+    meta_path_length = len(sys.meta_path)
+    for _ in range(2):
+        stubs = dict(generate_stubs(
+            'test_package', get_input_path(), output_dir=str(tmp_path),
+            described_objects=described_objects.DESCRIBED_OBJECTS, modules_aliases=modules_aliases,
+        ))
+        assert len(sys.meta_path) == meta_path_length
+        assert stubs == {get_module_name(module_path): stub for module_path, stub in expected_stubs.items()}
+        for module_path, expected_stub in expected_stubs.items():
+            assert (tmp_path / (module_path + 'i')).read_text() == expected_stub
+
+
+@pytest.mark.parametrize(
+    'module_name, expected_module_name',
+    [
+        ('foo', 'aliased_foo'),
+        ('foo.bar', 'aliased_foo.bar'),
+        ('foo.bar.baz', 'aliased_foo_bar_baz'),
+        ('foo.bar.baz.qux', 'aliased_foo_bar_baz.qux'),
+        ('foo.barbaz', 'aliased_foo.barbaz'),
+        # Prefixes are matched just as by str.startswith, including those ending in the middle of a segment
+        ('foobar', 'aliased_foobar'),
+        ('foo.bar.bazqux', 'aliased_foo_bar_bazqux'),
+        ('fo', 'fo'),
+        ('other.foo', 'other.foo'),
+    ],
+)
+def test_modules_aliases_mapping(module_name, expected_module_name):
+    modules_aliases_mapping = ModulesAliasesMapping({'foo': 'aliased_foo', 'foo.bar.baz': 'aliased_foo_bar_baz'})
+    assert modules_aliases_mapping.map_module_name(module_name) == expected_module_name
+
+
+def test_object_index_drops_objects_of_reimported_modules(monkeypatch):
+    object_index = ObjectIndex()
+    for _ in range(3):
+        module = types.ModuleType('reimported_module')
+        exec('class Class:\n    pass\n\n\ndef function():\n    pass\n', module.__dict__)
+        monkeypatch.setitem(sys.modules, 'reimported_module', module)
+        object_index.add_module(module)
+        assert len(object_index) == 2
+        assert object_index.get_module_name_and_qualname(module.Class) == ('reimported_module', 'Class')
+
+    object_index.remove_module('reimported_module')
+    assert len(object_index) == 0
+
+
+def test_object_index_memoizes_objects_without_modules(monkeypatch):
+    namespace = {'__name__': 'missing_module'}
+    exec(compile('def function():\n    pass\n', '<missing_module>', 'exec'), namespace)
+    looked_up_objects = []
+    getmodule = inspect.getmodule
+    monkeypatch.setattr(inspect, 'getmodule', lambda obj: looked_up_objects.append(obj) or getmodule(obj))
+
+    object_index = ObjectIndex()
+    for _ in range(2):
+        assert object_index.get_module_name_and_qualname(namespace['function']) == (None, 'function')
+    assert looked_up_objects.count(namespace['function']) == 1
+
+    # The module may be imported later
+    object_index.add_module(types.ModuleType('other_module'))
+    assert object_index.get_module_name_and_qualname(namespace['function']) == (None, 'function')
+    assert looked_up_objects.count(namespace['function']) == 2
+
+
+def test_introspection_cache_removes_modules(monkeypatch):
+    module = types.ModuleType('cached_module')
+    exec("class Class:\n    pass\n\n\ndef function(cls: 'Class') -> None:\n    pass\n", module.__dict__)
+    monkeypatch.setitem(sys.modules, 'cached_module', module)
+    introspection_cache = IntrospectionCache()
+    introspection_cache.get_signature(len)
+    introspection_cache.get_class_attributes(object)
+    size = len(introspection_cache)
+    introspection_cache.get_signature(module.function)
+    introspection_cache.get_type_hints(module.function, module.__dict__)
+    introspection_cache.get_class_attributes(module.Class)
+    introspection_cache.get_type_hint_origin_and_args(List[module.Class])
+    introspection_cache.are_almost_same(module.Class, object, lambda left, right: left is right)
+
+    assert len(introspection_cache) > size
+    introspection_cache.remove_module('cached_module')
+    assert len(introspection_cache) == size
+    introspection_cache.clear()
+    assert len(introspection_cache) == 0
+
+
+def test_introspection_cache_compares_members_once_per_comparison():
+    class Base:
+        @classmethod
+        def create(cls):
+            pass
+
+    class Derived(Base):
+        pass
+
+    compared_pairs = []
+
+    def compare(left, right):
+        compared_pairs.append((left, right))
+        return left.__func__ is right.__func__
+
+    introspection_cache = IntrospectionCache()
+    # Class methods are bound on every access
+    for _ in range(2):
+        assert introspection_cache.are_almost_same(Derived.create, Base.create, compare)
+    assert len(compared_pairs) == 1
+    # Verdicts of other comparisons are not reused
+    assert not introspection_cache.are_almost_same(Derived.create, Base.create, lambda left, right: False)
+
+
+def test_introspection_cache_warns_once_per_failed_forward_reference(caplog):
+    namespace = {}
+    exec("def first(task: 'Task') -> None:\n    pass\n\n\ndef second() -> 'Task':\n    pass\n", namespace)
+    introspection_cache = IntrospectionCache()
+    with caplog.at_level(logging.DEBUG):
+        for function_name in ('first', 'second'):
+            with pytest.raises(NameError):
+                introspection_cache.get_type_hints(namespace[function_name], namespace)
+    assert [record.levelno for record in caplog.records] == [logging.WARNING, logging.DEBUG]
+
+
+def test_singledispatchmethod_forwards_arguments():
+    @add_inherited_singledispatchmethod(method_name='view', implementation_prefix='view_')
+    class Viewer(ViewerBase):
+        def view(self, representation, prefix=''):
+            return f'{prefix}{representation!r}'
+
+        def view_number(self, number: int, prefix=''):
+            return f'{prefix}{number}'
+
+    viewer = Viewer()
+    assert viewer.view(1) == '1'
+    assert viewer.view(1, '> ') == '> 1'
+    assert viewer.view(representation=1, prefix='> ') == '> 1'
+    assert viewer.view('one', prefix='> ') == "> 'one'"
+
+
+def test_singledispatchmethod_calls_methods_replaced_on_instance():
+    @add_inherited_singledispatchmethod(method_name='view', implementation_prefix='view_')
+    class Viewer(ViewerBase):
+        def view(self, representation):
+            return repr(representation)
+
+        def view_number(self, number: int, prefix=''):
+            return f'{prefix}{number}'
+
+    viewer = Viewer()
+    assert viewer.view(1) == '1'
+    viewer.view_number = lambda number, prefix='': f'{prefix}number {number}'
+    assert viewer.view(1, prefix='> ') == '> number 1'
+    assert Viewer().view(1) == '1'
+
+
+def test_stub_viewer_subclass_overriding_view(monkeypatch):
+    @add_inherited_singledispatchmethod(method_name='view', implementation_prefix='view_')
+    class CustomViewer(StubViewer):
+        def view_function_definition(self, function_def: FunctionDef):
+            return f'# custom\n{super().view_function_definition(function_def)}'
+
+    module = types.ModuleType('custom_module')
+    exec(
+        "__all__ = ['Class', 'function']\n"
+        'class Class:\n'
+        '    def method(self) -> int: ...\n'
+        '    @classmethod\n'
+        '    def create(cls) -> int: ...\n'
+        'def function() -> int: ...\n',
+        module.__dict__,
+    )
+    monkeypatch.setitem(sys.modules, 'custom_module', module)
+    builder = RepresentationsTreeBuilder('custom_module', module)
+
+    # Overridden view is used for members of modules and classes as well
+    assert CustomViewer().view(builder.module_rep) == (
+        "__all__ = [\n    'Class',\n    'function',\n]\n"
+        'class Class:\n'
+        '    # custom\n'
+        '    def method(self) -> int: ...\n'
+        '\n'
+        '    @classmethod\n'
+        '    # custom\n'
+        '    def create(cls) -> int: ...\n'
+        '\n'
+        '\n'
+        '# custom\n'
+        'def function() -> int: ...\n'
+    )
+
+
+def test_literal_views_memoized_in_module_context(monkeypatch):
+    module = types.ModuleType('repeated_annotations')
+    exec(
+        "__all__ = ['first', 'second']\n"
+        'def first(a: int, b: int) -> int: ...\n'
+        'def second(a: int) -> int: ...\n',
+        module.__dict__,
+    )
+    monkeypatch.setitem(sys.modules, 'repeated_annotations', module)
+    module_def = RepresentationsTreeBuilder('repeated_annotations', module).module_rep
+
+    viewer = StubViewer()
+    with StubViewer.ModuleContext(module_def, viewer) as module_context:
+        assert viewer.view(module_def.members['first']) == 'def first(a: int, b: int) -> int: ...\n\n'
+        assert viewer.view(module_def.members['second']) == 'def second(a: int) -> int: ...\n\n'
+        assert module_context.literal_views_hits > 0
+        assert module_context.literal_views_misses == len(module_context.literal_views) > 0
+        hits, misses = module_context.literal_views_hits, module_context.literal_views_misses
+
+    # Views are forgotten once the module is rendered, while counters are added to the viewer totals
+    assert module_context.literal_views == {}
+    assert (viewer.literal_views_hits, viewer.literal_views_misses) == (hits, misses)
+
+    viewer.view(module_def)
+    assert viewer.literal_views_hits > hits
+
+
+def test_timings(tmp_path):
+    timings_path = tmp_path / 'timings.json'
+    process = subprocess.run(
+        [
+            STUBMAKER_CMD,
+            '--module-root', 'test_package',
+            '--src-root', get_input_path(),
+            '--output-dir', str(tmp_path / 'output'),
+            '--timings',
+            '--timings-json', str(timings_path),
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    assert process.stderr.startswith('Stub generation took ')
+
+    with open(timings_path) as timings_file:
+        timings = json.load(timings_file)
+    assert set(timings['phases']) == {'import', 'build', 'render', 'write'}
+    assert {module['module'] for module in timings['modules']} == {
+        line.split(' -> ')[0] for line in process.stdout.splitlines()
+    }
+    module_totals = [module['total'] for module in timings['modules']]
+    assert module_totals == sorted(module_totals, reverse=True)
+    assert timings['total'] == pytest.approx(sum(timings['phases'].values()))
+
+
+def run_incremental_stubmaker(src_path, output_path):
+    process = subprocess.run(
+        [
+            STUBMAKER_CMD,
+            '--module-root', 'test_package',
+            '--src-root', src_path,
+            '--output-dir', output_path,
+            '--incremental',
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    return process.stdout.splitlines()
+
+
+def test_incremental_generation(tmp_path):
+    src_path = str(tmp_path / 'test_package')
+    output_path = str(tmp_path / 'output')
+    shutil.copytree(get_input_path(), src_path)
+
+    assert len(run_incremental_stubmaker(src_path, output_path)) == len(get_module_paths())
+    assert run_incremental_stubmaker(src_path, output_path) == []
+
+    with open(os.path.join(src_path, 'enums.py'), 'a') as module_file:
+        module_file.write('\nCHANGED = 1\n')
+    # imports module imports names from enums module, so its stub is regenerated as well
+    assert run_incremental_stubmaker(src_path, output_path) == [
+        f'test_package.enums -> {os.path.join(output_path, "enums.pyi")}',
+        f'test_package.imports -> {os.path.join(output_path, "imports.pyi")}',
+    ]
+
+    os.remove(os.path.join(src_path, 'async.py'))
+    assert run_incremental_stubmaker(src_path, output_path) == [f'Removed {os.path.join(output_path, "async.pyi")}']
+    assert not os.path.exists(os.path.join(output_path, 'async.pyi'))
+
+
+def test_incremental_generation_of_dependent_modules(tmp_path):
+    src_path = tmp_path / 'test_package'
+    output_path = str(tmp_path / 'output')
+    src_path.mkdir()
+    (src_path / '__init__.py').write_text("__all__ = ['Base']\nfrom .base import Base\n")
+    (src_path / 'base.py').write_text("__all__ = ['Base']\n\n\nclass Base:\n    pass\n")
+    (src_path / 'derived.py').write_text(
+        "__all__ = ['Derived']\nfrom .base import Base\n\n\nclass Derived(Base):\n    pass\n"
+    )
+    (src_path / 'factory.py').write_text(
+        "__all__ = ['create']\nfrom .derived import Derived\n\n\ndef create() -> Derived:\n    pass\n"
+    )
+    (src_path / 'unrelated.py').write_text("__all__ = ['function']\n\n\ndef function():\n    pass\n")
+    assert len(run_incremental_stubmaker(str(src_path), output_path)) == 5
+
+    # Stubs depending on the changed module directly or transitively are regenerated
+    (src_path / 'base.py').write_text(
+        "__all__ = ['Base']\n\n\nclass Base:\n    def method(self) -> int:\n        pass\n"
+    )
+    assert run_incremental_stubmaker(str(src_path), output_path) == [
+        f'test_package -> {os.path.join(output_path, "__init__.pyi")}',
+        f'test_package.base -> {os.path.join(output_path, "base.pyi")}',
+        f'test_package.derived -> {os.path.join(output_path, "derived.pyi")}',
+        f'test_package.factory -> {os.path.join(output_path, "factory.pyi")}',
+    ]
+
+    (src_path / 'factory.py').write_text("__all__ = ['create']\n\n\ndef create() -> int:\n    pass\n")
+    assert run_incremental_stubmaker(str(src_path), output_path) == [
+        f'test_package.factory -> {os.path.join(output_path, "factory.pyi")}',
+    ]
+    (src_path / 'derived.py').write_text("__all__ = ['Derived']\n\n\nclass Derived:\n    pass\n")
+    assert run_incremental_stubmaker(str(src_path), output_path) == [
+        f'test_package.derived -> {os.path.join(output_path, "derived.pyi")}',
+    ]
+
+
+def test_static_generation_without_dependencies(tmp_path):
+    src_path = tmp_path / 'package_with_missing_dependency'
+    src_path.mkdir()
+    (src_path / '__init__.py').write_text(
+        "__all__ = ['Model', 'load']\n"
+        'import missing_dependency.nn\n'
+        'from missing_dependency.io import Reader\n'
+        '\n'
+        '\n'
+        'class Model(missing_dependency.nn.Module):\n'
+        '    def forward(self, x: missing_dependency.nn.Tensor) -> Reader:\n'
+        '        import missing_dependency.nn.functional\n'
+        '\n'
+        '\n'
+        'def load(path: str, reader: Reader = Reader()) -> Model:\n'
+        '    pass\n'
+    )
+    subprocess.run(
+        [
+            STUBMAKER_CMD,
+            '--module-root', 'package_with_missing_dependency',
+            '--src-root', str(src_path),
+            '--output-dir', str(tmp_path / 'output'),
+            '--static',
+        ],
+        stdout=subprocess.PIPE, check=True,
+    )
+    assert (tmp_path / 'output' / '__init__.pyi').read_text() == (
+        '__all__ = [\n'
+        "    'Model',\n"
+        "    'load',\n"
+        ']\n'
+        'import missing_dependency.io\n'
+        'import missing_dependency.nn\n'
+        '\n'
+        '\n'
+        'class Model(missing_dependency.nn.Module):\n'
+        '    def forward(self, x: missing_dependency.nn.Tensor) -> missing_dependency.io.Reader: ...\n'
+        '\n'
+        '\n'
+        'def load(path: str, reader: missing_dependency.io.Reader = ...) -> Model: ...\n'
+    )
+
+
+def write_package_with_pathological_modules(src_path):
+    src_path.mkdir()
+    (src_path / '__init__.py').write_text("__all__ = ['function']\n\n\ndef function() -> int:\n    pass\n")
+    (src_path / 'slow.py').write_text('__all__ = []\nimport time\n\ntime.sleep(60)\n')
+    (src_path / 'large.py').write_text('__all__ = []\nimport time\n\nDATA = bytearray(512 * 2 ** 20)\ntime.sleep(60)\n')
+
+
+def run_stubmaker_with_budget(src_path, output_path, *budget_args):
+    process = subprocess.run(
+        [
+            STUBMAKER_CMD,
+            '--module-root', 'package_with_pathological_modules',
+            '--src-root', str(src_path),
+            '--output-dir', str(output_path),
+            *budget_args,
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True, timeout=30,
+    )
+    return process.stdout.splitlines()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='memory budget requires /proc')
+def test_module_budgets(tmp_path):
+    src_path = tmp_path / 'package_with_pathological_modules'
+    write_package_with_pathological_modules(src_path)
+
+    output_path = tmp_path / 'output'
+    init_stub_path = output_path / '__init__.pyi'
+    large_stub_path = output_path / 'large.pyi'
+    slow_stub_path = output_path / 'slow.pyi'
+    assert run_stubmaker_with_budget(
+        src_path, output_path, '--module-timeout', '5', '--module-memory-limit', '256', '--jobs', '2',
+    ) == [
+        f'package_with_pathological_modules -> {init_stub_path}',
+        f'package_with_pathological_modules.large -> {large_stub_path} (minimal stub)',
+        f'package_with_pathological_modules.slow -> {slow_stub_path} (minimal stub)',
+    ]
+    assert init_stub_path.read_text() == "__all__ = [\n    'function',\n]\ndef function() -> int: ...\n"
+    assert slow_stub_path.read_text() == (
+        '# Stub generation for module package_with_pathological_modules.slow exceeded time budget of 5s\n'
+        'from typing import Any\n'
+        '\n'
+        '\n'
+        'def __getattr__(name: str) -> Any: ...\n'
+    )
+    assert 'exceeded memory budget of 256MB' in large_stub_path.read_text()
+
+    skipped_output_path = tmp_path / 'skipped_output'
+    skipped_init_stub_path = skipped_output_path / '__init__.pyi'
+    assert run_stubmaker_with_budget(
+        src_path, skipped_output_path, '--module-timeout', '1', '--on-budget-exceeded', 'skip',
+    ) == [f'package_with_pathological_modules -> {skipped_init_stub_path}']
+    assert not (skipped_output_path / 'slow.pyi').exists()
+
+
+def read_output_lines(process):
+    # Lines are read in a thread so that waiting for them can time out
+    lines = queue.Queue()
+    threading.Thread(target=lambda: [lines.put(line.rstrip('\n')) for line in process.stdout], daemon=True).start()
+    return partial(lines.get, timeout=10)
+
+
+def test_watch(tmp_path):
+    src_path = tmp_path / 'watched_package'
+    src_path.mkdir()
+    (src_path / '__init__.py').write_text('__all__ = []\n')
+    (src_path / 'module.py').write_text("__all__ = ['function']\n\n\ndef function() -> int:\n    pass\n")
+
+    output_path = tmp_path / 'output'
+    init_stub_path = output_path / '__init__.pyi'
+    module_stub_path = output_path / 'module.pyi'
+    process = subprocess.Popen(
+        [
+            STUBMAKER_CMD,
+            '--module-root', 'watched_package',
+            '--src-root', str(src_path),
+            '--output-dir', str(output_path),
+            '--watch', '--watch-interval', '0.05',
+        ],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        read_output_line = read_output_lines(process)
+        assert read_output_line() == f'watched_package -> {init_stub_path}'
+        assert read_output_line() == f'watched_package.module -> {module_stub_path}'
+
+        # The size changes along with the content, so the change is detected even with coarse modification times
+        (src_path / 'module.py').write_text("__all__ = ['function']\n\n\ndef function() -> bytes:\n    pass\n")
+        assert read_output_line() == f'watched_package.module -> {module_stub_path}'
+        assert module_stub_path.read_text() == (
+            "__all__ = [\n    'function',\n]\n"
+            'def function() -> bytes: ...\n'
+        )
+
+        (src_path / 'module.py').unlink()
+        assert read_output_line() == f'Removed {module_stub_path}'
+        assert not module_stub_path.exists()
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_watch_drops_objects_of_unloaded_modules(monkeypatch):
+    options = {'object_index': ObjectIndex(), 'introspection_cache': IntrospectionCache()}
+    sizes = []
+    for version in range(5):
+        module = types.ModuleType('edited_module')
+        source = (
+            "__all__ = ['Class']\n\n\n"
+            f"class Class:\n    def method(self, other: 'Class') -> int:\n        return {version}\n"
+        )
+        exec(source, module.__dict__)
+        monkeypatch.setitem(sys.modules, 'edited_module', module)
+        options['object_index'].add_module(module)
+        render_stub('edited_module', module, io.StringIO(), **options)
+        assert len(options['introspection_cache']) > 0
+
+        make_stubs._unload_modules(['edited_module'], None, options)
+        sizes.append(len(options['introspection_cache']))
+    assert len(set(sizes)) == 1